@@ -1,23 +1,175 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+import itertools
 import os
 import json
-import tempfile
-from parsers.bank_parsers import detect_bank_and_parse
-
-app = Flask(__name__)
-CORS(app)
+import threading
+import time
+from parsers import telemetry
+from parsers.bank_parsers import detect_bank_and_parse, warm_up
+from parsers.document import Document, UnparseablePDF
+from parsers.batch import parse_many
+from parsers.segments import split_and_parse
+from parsers.cache import ResultCache
+from parsers.export import ExportError, exporter
+from parsers.fingerprint import THRESHOLD, FingerprintIndex, document_signature, summary_key
+from parsers.jobs import JobQueue, QueueFull, DONE, FAILED
+from parsers.record import StatementRecord
+from parsers.store import MAX_LIMIT, StatementStore
+from parsers.upload import SpooledUpload
 
 # Configuration for Vercel
 ALLOWED_EXTENSIONS = {'pdf'}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_MB', 200)) * 1024 * 1024
+MAX_EXPORT_SIZE = 256 * 1024 * 1024  # results posted to /api/download
+
+class AppRequest(Request):
+    @property
+    def max_content_length(self):
+        # Exports carry many parse results rather than a PDF upload
+        if self.endpoint == 'download_data':
+            return MAX_EXPORT_SIZE
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Uploaded files are spooled to disk past a threshold and hashed as
+        # Werkzeug writes them, instead of being read into memory whole
+        return SpooledUpload()
+
+app = Flask(__name__)
+app.request_class = AppRequest
+CORS(app)
 
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Parse results are cached by file content; set RESULT_CACHE_DB to a SQLite
+# path to keep them across restarts and share them between workers
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 256)),
+    ttl=int(os.environ.get('RESULT_CACHE_TTL', 24 * 3600)),
+    db_path=os.environ.get('RESULT_CACHE_DB') or None,
+)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if request.path.startswith('/api/') and 'request_start' in g:
+        endpoint = request.endpoint or 'unknown'
+        telemetry.observe(f'request_{endpoint}', time.perf_counter() - g.request_start)
+        telemetry.REQUESTS.inc(endpoint, str(response.status_code))
+    return response
+
+# Set STATEMENT_DB to a SQLite path to keep every parsed statement for
+# GET /api/statements
+statement_store = StatementStore(os.environ['STATEMENT_DB']) if os.environ.get('STATEMENT_DB') else None
+
+# Uploads whose text nearly matches an earlier one's (the same statement
+# downloaded again, re-saved or watermarked) and whose card, total due and
+# due date are the same are caught by fingerprint: NEAR_DUPLICATES=flag
+# marks the result, reuse answers with the earlier result instead, off
+# skips the check. Set FINGERPRINT_DB to a SQLite path to keep the
+# fingerprints across restarts
+NEAR_DUPLICATES = os.environ.get('NEAR_DUPLICATES', 'flag')
+fingerprints = None if NEAR_DUPLICATES == 'off' else FingerprintIndex(
+    os.environ.get('FINGERPRINT_DB') or None,
+    threshold=float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', THRESHOLD)),
+)
+
+def earlier_result(match):
+    """Result of the statement a fingerprint matched, if it is still cached or stored"""
+    result = result_cache.get(match['cache_key'])
+    if result is None and statement_store is not None and match['content_hash']:
+        result = statement_store.get(match['content_hash'])
+    return result
+
+def parse_new(upload):
+    """
+    Parse an upload the result cache has not seen. The pages the parse read
+    are then fingerprinted, and a near-duplicate's result is flagged or
+    reused in _meta.near_duplicate
+    """
+    if fingerprints is None:
+        return detect_bank_and_parse(upload.path or upload.view())
+    document = Document(upload.path or upload.view())
+    result = detect_bank_and_parse(document)
+    if result is None or degraded(result):
+        return result
+    with telemetry.span('fingerprint'):
+        # The parse's own pages and fields: nothing is read or matched twice
+        sig = document_signature(document)
+        summary = summary_key(result)
+        match = fingerprints.query(sig, summary) if sig is not None else None
+    if match is not None:
+        seen = {'of': match['content_hash'], 'similarity': match['similarity']}
+        if NEAR_DUPLICATES == 'reuse' and summary is not None:
+            earlier = earlier_result(match)
+            # The earlier result has to agree with the fields read from this file
+            if earlier is not None and summary_key(earlier) == summary:
+                telemetry.NEAR_DUPLICATES.inc('reused')
+                earlier.setdefault('_meta', {})['near_duplicate'] = dict(seen, reused=True)
+                return earlier
+        telemetry.NEAR_DUPLICATES.inc('flagged')
+        result['_meta']['near_duplicate'] = dict(seen, reused=False)
+    if sig is not None:
+        fingerprints.add(sig, upload.cache_key, upload.content_hash, summary)
+    return result
+
+def parse_upload(upload):
+    """Background job: parse a retained upload and release it"""
+    try:
+        return parse_new(upload)
+    finally:
+        upload.close()
+
+# Background parsing for /api/jobs: a few worker threads drain a bounded
+# queue, and finished jobs are kept for JOB_TTL seconds
+job_queue = JobQueue(
+    work=parse_upload,
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_queued=int(os.environ.get('JOB_QUEUE_SIZE', 32)),
+    ttl=int(os.environ.get('JOB_TTL', 3600)),
+)
+# Longest a GET /api/jobs/<id>?wait=... may hold the connection
+MAX_JOB_WAIT = 25
+
+# Long-running servers can warm up in the background right after import;
+# serverless platforms call /api/warmup instead
+if os.environ.get('WARM_UP_ON_START') == '1':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def degraded(result):
+    """Whether a field of the result gave up at its regex deadline, so a later parse may do better"""
+    return bool(result.get('_meta', {}).get('timed_out'))
+
+def store_result(cache_key, digest, result, filename):
+    """Cache a fresh result and keep it in the statement store, if there is one"""
+    # A degraded result is stored, and replaced when the file is parsed again
+    if not degraded(result):
+        result_cache.put(cache_key, result)
+    # A reused near-duplicate result is already in the store under the earlier file
+    reused = result.get('_meta', {}).get('near_duplicate', {}).get('reused')
+    if statement_store is not None and not reused:
+        statement_store.add(digest, result, filename)
+
+def spooled(file):
+    """The SpooledUpload behind an uploaded file"""
+    if isinstance(file.stream, SpooledUpload):
+        return file.stream
+    return SpooledUpload.from_stream(file.stream)
+
+def result_json(result):
+    """The result as sent, or its typed record with ?typed=1"""
+    if request.args.get('typed') in ('1', 'true'):
+        return jsonify(StatementRecord.from_result(result).to_json())
+    return jsonify(result)
+
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
@@ -43,70 +195,333 @@ def parse_statement():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Only PDF files are allowed'}), 400
         
-        # Save file temporarily using tempfile for Vercel compatibility
         filename = secure_filename(file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            file.save(tmp_file.name)
-            filepath = tmp_file.name
+        upload = spooled(file)
+        with telemetry.span('cache_lookup'):
+            cache_key = upload.cache_key
+            cached = result_cache.get(cache_key)
+        if cached is not None:
+            telemetry.CACHE_LOOKUPS.inc('hit')
+            telemetry.log('parse_cache_hit', file=filename)
+            cached.setdefault('_meta', {})['cache'] = 'hit'
+            return result_json(cached), 200
+        telemetry.CACHE_LOOKUPS.inc('miss')
         
         try:
-            # Parse the PDF
-            print(f"\n{'='*50}")
-            print(f"📄 Processing file: {filename}")
-            print(f"{'='*50}")
+            # Parse the PDF in place: the spooled buffer, or an mmap of the spooled file
+            telemetry.log('parse_started', file=filename, bytes=upload.size, spooled=upload.path is not None)
             
-            result = detect_bank_and_parse(filepath)
+            with telemetry.span('parse'):
+                result = parse_new(upload)
             
             if result is None:
-                print("❌ Parsing failed - no data extracted")
+                telemetry.log('parse_failed', level='warning', file=filename)
                 return jsonify({'error': 'Could not parse the statement. The PDF may be scanned/image-based or format is not recognized. Please try a different statement.'}), 400
             
-            print(f"\n✅ Successfully parsed statement!")
-            print(f"Bank: {result.get('Bank', 'Unknown')}")
-            print(f"{'='*50}\n")
+            with telemetry.span('cache_store'):
+                store_result(cache_key, upload.content_hash, result, filename)
+            
+            telemetry.log('parse_finished', file=filename, bank=result.get('Bank', 'Unknown'), **result.get('_meta', {}))
             
-            return jsonify(result), 200
+            return result_json(result), 200
             
+        except UnparseablePDF as e:
+            # Rejected up front or stopped at a budget; partial fields included if any
+            telemetry.log('parse_rejected', level='warning', file=filename, reason=e.reason)
+            return jsonify(e.to_dict()), 422
+        
         except Exception as e:
+            telemetry.log('parse_error', level='error', file=filename, error=str(e))
             return jsonify({'error': f'Error parsing PDF: {str(e)}'}), 500
-        
-        finally:
-            # Clean up - delete the uploaded file
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-            except Exception as e:
-                print(f"Warning: Could not delete temp file {filepath}: {e}")
     
     except Exception as e:
+        telemetry.log('server_error', level='error', error=str(e))
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/parse/batch', methods=['POST'])
+def parse_batch():
+    """Parse every uploaded file and stream one JSON record per line as each finishes"""
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    workers = int(os.environ.get('BATCH_WORKERS', 0)) or None
+    records = []
+    to_parse = []
+    # Spooled files the workers open by path after the request has returned
+    retained = []
+    for index, file in enumerate(files):
+        filename = secure_filename(file.filename or '') or f'#{index}'
+        if not allowed_file(file.filename or ''):
+            records.append({'index': index, 'source': filename, 'error': 'Only PDF files are allowed'})
+            continue
+        upload = spooled(file)
+        cache_key = upload.cache_key
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            telemetry.CACHE_LOOKUPS.inc('hit')
+            cached.setdefault('_meta', {})['cache'] = 'hit'
+            records.append({'index': index, 'source': filename, 'result': cached})
+        else:
+            telemetry.CACHE_LOOKUPS.inc('miss')
+            # Worker processes open a spooled file by path; only uploads
+            # small enough to stay in memory are sent as bytes
+            if upload.path:
+                retained.append(upload.retain())
+            to_parse.append((index, filename, upload.path or upload.read(), cache_key, upload.content_hash))
+    
+    def generate():
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+        keys = {}
+        sources = []
+        for index, filename, source, cache_key, digest in to_parse:
+            keys[len(sources)] = (index, cache_key, digest)
+            sources.append((filename, source))
+        # Results reach the statement store in batches, not one transaction each
+        writer = statement_store.bulk() if statement_store is not None else None
+        try:
+            for record in parse_many(sources, workers=workers):
+                index, cache_key, digest = keys[record['index']]
+                record['index'] = index
+                if 'result' in record:
+                    if not degraded(record['result']):
+                        result_cache.put(cache_key, record['result'])
+                    if writer is not None:
+                        writer.add(digest, record['result'], record['source'])
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        finally:
+            if writer is not None:
+                writer.flush()
+            for upload in retained:
+                upload.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/parse/split', methods=['POST'])
+def parse_split():
+    """Parse a PDF that may hold several statements back to back, one result per statement"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'error': 'Only PDF files are allowed'}), 400
+    
+    filename = secure_filename(file.filename)
+    upload = spooled(file)
+    workers = int(os.environ.get('SPLIT_WORKERS', 0)) or None
+    try:
+        with telemetry.span('parse_split'):
+            # Worker processes open a spooled file by path rather than receive a copy
+            statements = split_and_parse(upload.path or upload.view(), workers=workers)
+    except UnparseablePDF as e:
+        telemetry.log('parse_rejected', level='warning', file=filename, reason=e.reason)
+        return jsonify(e.to_dict()), 422
+    except Exception as e:
+        telemetry.log('parse_error', level='error', file=filename, error=str(e))
+        return jsonify({'error': f'Error parsing PDF: {str(e)}'}), 500
+    
+    telemetry.log('parse_split_finished', file=filename, statements=len(statements))
+    return jsonify({'statements': statements}), 200
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a statement for parsing and return the job id straight away"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Only PDF files are allowed'}), 400
+    
+    filename = secure_filename(file.filename)
+    upload = spooled(file)
+    cache_key = upload.cache_key
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        telemetry.CACHE_LOOKUPS.inc('hit')
+        cached.setdefault('_meta', {})['cache'] = 'hit'
+        job_id = job_queue.complete(cached, name=filename)
+    else:
+        telemetry.CACHE_LOOKUPS.inc('miss')
+        digest = upload.content_hash
+        try:
+            # The job keeps the upload open after this request closes it
+            job_id = job_queue.submit(upload.retain(), name=filename, on_done=lambda result: store_result(cache_key, digest, result, filename))
+        except QueueFull as e:
+            upload.close()
+            response = jsonify({'error': 'Too many statements queued, try again later', 'retry_after': e.retry_after})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+    
+    response = jsonify(_job_view(job_queue.get(job_id)))
+    response.headers['Location'] = f'/api/jobs/{job_id}'
+    return response, 202
+
+def _job_view(job):
+    """What clients see of a job"""
+    view = {'id': job['id'], 'status': job['status'], 'source': job.get('source')}
+    if job['status'] == DONE:
+        view['result'] = job['result']
+    elif job['status'] == FAILED:
+        view['error'] = job['error']
+        for key in ('reason', 'partial'):
+            if key in job:
+                view[key] = job[key]
+    return view
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of a job; ?wait=N holds the request up to N seconds for it to finish"""
+    wait = min(request.args.get('wait', 0, type=float), MAX_JOB_WAIT)
+    job = job_queue.wait(job_id, wait) if wait > 0 else job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(_job_view(job)), 200
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events: the job's status whenever it changes, ending with the result"""
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    def generate():
+        last_status = None
+        started = time.monotonic()
+        while time.monotonic() - started < MAX_JOB_WAIT:
+            job = job_queue.wait(job_id, 5)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Unknown or expired job"}\n\n'
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                event = 'result' if last_status in (DONE, FAILED) else 'status'
+                yield f"event: {event}\ndata: {json.dumps(_job_view(job), ensure_ascii=False)}\n\n"
+                if event == 'result':
+                    return
+            else:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': waiting\n\n'
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats()), 200
+
+@app.route('/api/warmup', methods=['GET', 'POST'])
+def warmup():
+    """Hook for platforms that ping new instances: loads PyMuPDF and compiles the patterns"""
+    seconds = warm_up()
+    return jsonify({'warm_up_ms': round(seconds * 1000, 2)}), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats()), 200
+
+@app.route('/api/fingerprints/stats', methods=['GET'])
+def fingerprint_stats():
+    if fingerprints is None:
+        return jsonify({'error': 'Near-duplicate detection is off'}), 404
+    return jsonify(fingerprints.stats()), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Stage timings and counters in the Prometheus text format"""
+    return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/statements', methods=['GET'])
+def list_statements():
+    """
+    Stored statements, filtered by bank, last4, due_from/due_to and
+    cycle_from/cycle_to (ISO dates); page with limit and the next cursor
+    passed back as after. full=1 adds each parse result.
+    """
+    if statement_store is None:
+        return jsonify({'error': 'No statement store configured, set STATEMENT_DB'}), 404
+    args = request.args
+    statements, next_after = statement_store.query(
+        bank=args.get('bank'),
+        card_last4=args.get('last4'),
+        due_from=args.get('due_from'),
+        due_to=args.get('due_to'),
+        cycle_from=args.get('cycle_from'),
+        cycle_to=args.get('cycle_to'),
+        after=args.get('after', type=int),
+        limit=min(args.get('limit', 50, type=int), MAX_LIMIT),
+        full=args.get('full') in ('1', 'true'),
+    )
+    return jsonify({'statements': statements, 'next': next_after}), 200
+
+def _result_line(line):
+    """The result object on one NDJSON line, or None if the line holds anything else"""
+    try:
+        result = json.loads(line)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) else None
+
+def _later_results(lines, number):
+    """
+    Result objects of the NDJSON records after the number-th; the response
+    has started by then, so a bad record is logged and skipped
+    """
+    for number, line in enumerate(lines, number + 1):
+        result = _result_line(line)
+        if result is None:
+            telemetry.log('export_record_skipped', level='warning', record=number)
+            continue
+        yield result
+
+def _results_from_request():
+    """
+    Parse results posted for export: one object, a JSON array, or NDJSON read
+    line by line. Returns None if the body is none of these. Everything is
+    checked before the response starts, except NDJSON past its first line.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        lines = (line for line in request.stream if line.strip())
+        first = _result_line(next(lines, b''))
+        if first is None:
+            return None
+        return itertools.chain([first], _later_results(lines, 1))
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        return [data]
+    if not isinstance(data, list) or not all(isinstance(result, dict) for result in data):
+        return None
+    return data
+
 @app.route('/api/download/<format>', methods=['POST'])
 def download_data(format):
     try:
-        data = request.json
+        if format == 'json' and request.mimetype != 'application/x-ndjson':
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                return jsonify(data), 200
         
-        if format == 'json':
-            return jsonify(data), 200
+        try:
+            writer, mimetype, extension = exporter(format)
+        except ExportError as e:
+            return jsonify({'error': str(e)}), 400
         
-        elif format == 'csv':
-            import pandas as pd
-            df = pd.DataFrame([data])
-            csv_data = df.to_csv(index=False)
-            return csv_data, 200, {
-                'Content-Type': 'text/csv',
-                'Content-Disposition': 'attachment; filename=statement_data.csv'
-            }
+        results = _results_from_request()
+        if results is None:
+            return jsonify({'error': 'Expected a parse result, a JSON array of them or NDJSON, one per line'}), 400
         
-        else:
-            return jsonify({'error': 'Invalid format'}), 400
+        return Response(stream_with_context(writer(results)), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=statement_data.{extension}'
+        })
             
     except Exception as e:
         return jsonify({'error': f'Download error: {str(e)}'}), 500
 
 @app.errorhandler(413)
 def file_too_large(e):
-    return jsonify({'error': 'File size exceeds 5MB limit'}), 413
+    return jsonify({'error': f'File size exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB limit'}), 413
 
 # For Vercel deployment
 def handler(request):
@@ -0,0 +1,50 @@
+"""
+Throughput of parse_many() against worker count
+Usage: python -m benchmarks.bench_batch [copies]
+
+Parses the sample/ corpus, repeated copies times, with 1, 2, 4, ... worker
+processes up to the CPU count and reports docs/sec and scaling.
+"""
+
+import glob
+import os
+import sys
+import time
+
+from parsers.batch import parse_many
+
+
+def worker_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main(copies):
+    paths = sorted(glob.glob("sample/*.pdf"))
+    if not paths:
+        print("No sample PDFs found, run from the repository root")
+        return 1
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append((path, f.read()))
+    corpus = blobs * copies
+
+    print(f"{len(corpus)} documents")
+    print(f"{'workers':>8} {'seconds':>8} {'docs/sec':>9} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts():
+        start = time.perf_counter()
+        failed = sum("error" in record for record in parse_many(corpus, workers=workers))
+        elapsed = time.perf_counter() - start
+        rate = len(corpus) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>8.2f} {rate:>9.1f} {rate / baseline:>7.2f}x" + (f"  ({failed} failed)" if failed else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
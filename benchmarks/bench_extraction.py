@@ -0,0 +1,69 @@
+"""
+Microbenchmark for the GenericParser field extraction engine
+Usage: python -m benchmarks.bench_extraction [pages ...]
+
+Builds large multi-page statements from the text of the sample PDFs and
+times extract_fields() with anchor prefiltering against the plain
+full-document cascade the parsers used before.
+"""
+
+import glob
+import sys
+import time
+
+from parsers.base_parser import BaseParser
+from parsers.extraction import extract_fields
+
+DEFAULT_PAGES = [1, 10, 50, 200]
+
+
+def transaction_lines(text):
+    """Lines from the transaction table, used as filler pages"""
+    lines = text.splitlines()
+    start = next((i for i, line in enumerate(lines) if line.startswith("Running Balance")), 0)
+    return lines[start + 1:start + 60]
+
+
+def build_statement(text, pages, header=True):
+    """Sample statement followed by pages of transactions"""
+    filler = "\n".join(transaction_lines(text)) + "\n"
+    if not header:
+        # Without the header every field is missing, the worst case for the cascade
+        return filler * pages
+    return text + filler * (pages - 1)
+
+
+def time_call(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(pages_list):
+    samples = sorted(glob.glob("sample/*.pdf"))
+    if not samples:
+        print("No sample PDFs found, run from the repository root")
+        return 1
+    text = BaseParser(samples[0]).text
+
+    print(f"{'pages':>6} {'doc':>8} {'chars':>10} {'full scan ms':>13} {'engine ms':>10} {'speedup':>8}")
+    for pages in pages_list:
+        for label, header in (("normal", True), ("missing", False)):
+            doc = build_statement(text, pages, header)
+            expected = extract_fields(doc, anchored=False)
+            if extract_fields(doc) != expected:
+                print(f"❌ Output mismatch on {pages}-page {label} statement")
+                return 1
+            repeat = 20 if pages < 50 else 5
+            full = time_call(lambda: extract_fields(doc, anchored=False), repeat)
+            engine = time_call(lambda: extract_fields(doc), repeat)
+            print(f"{pages:>6} {label:>8} {len(doc):>10} {full * 1000:>13.2f} {engine * 1000:>10.2f} {full / engine:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]] or DEFAULT_PAGES
+    sys.exit(main(args))
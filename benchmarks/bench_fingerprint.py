@@ -0,0 +1,112 @@
+"""
+Near-duplicate lookups against a large fingerprint index
+Usage: python -m benchmarks.bench_fingerprint [--count 300000] [--statements 40] [--max-ms 1.0]
+
+Fills a FingerprintIndex, in memory and in a SQLite file, with count
+random signatures plus the signatures of synthetic statements. It then
+looks up, for each statement
+  - a watermarked copy, which must find the original,
+  - a new statement, which must find nothing, and
+  - the same statement with another total due, the same layout and text
+    but for one amount, which must find nothing either.
+Fails (exit code 1) on a wrong answer or if a lookup's p95 is above max-ms.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from benchmarks.suite import percentile
+from benchmarks.synthetic import make_statement_pdf
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import Document
+from parsers.fingerprint import BINS, FingerprintIndex, document_signature, summary_key
+
+BANKS = ["HDFC Bank", "ICICI Bank", "SBI Card", "American Express"]
+
+
+def watermarked(data, note):
+    """data with note stamped at the top of every page"""
+    doc = fitz.open("pdf", data)
+    for page in doc:
+        page.insert_text((36, 18), note, fontsize=7)
+    marked = doc.tobytes()
+    doc.close()
+    return marked
+
+
+def statement_signature(data):
+    """(signature, summary key) of a statement, as app.parse_new() takes them from its parse"""
+    document = Document(data)
+    result = detect_bank_and_parse(document)
+    return document_signature(document), summary_key(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_fingerprint", description="Near-duplicate lookups")
+    parser.add_argument("--count", type=int, default=300_000, help="random signatures to fill the index with")
+    parser.add_argument("--statements", type=int, default=40, help="statements looked up, and as many of each other case")
+    parser.add_argument("--max-ms", type=float, default=1.0, help="allowed p95 per lookup")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    filler = [(tuple(rng.getrandbits(32) for _ in range(BINS)), f"filler-{index}", None, None)
+              for index in range(args.count)]
+    originals, lookups = [], []
+    start = time.perf_counter()
+    for index in range(args.statements):
+        bank = BANKS[index % len(BANKS)]
+        pages = 1 + index % 3
+        data = make_statement_pdf(pages, index, bank)
+        sig, summary = statement_signature(data)
+        originals.append((sig, f"statement-{index}", None, summary))
+        copy = watermarked(data, f"Downloaded on {index % 28 + 1:02d}/10/2025 10:{index % 60:02d}")
+        lookups.append(("copy", statement_signature(copy), f"statement-{index}"))
+        lookups.append(("new", statement_signature(make_statement_pdf(pages, 10_000 + index, bank)), None))
+        other_total = f"{index + 1:,}.{index % 100:02d}"
+        lookups.append(("other total", statement_signature(make_statement_pdf(pages, index, bank, other_total)), None))
+    per_statement = (time.perf_counter() - start) / (args.statements * 4)
+    print(f"🔏 {args.statements * 4} statements read and fingerprinted, {per_statement * 1000:.1f} ms each")
+
+    failures = []
+    indexes = [
+        ("memory", FingerprintIndex(max_entries=args.count + args.statements)),
+        ("sqlite", FingerprintIndex(os.path.join(tempfile.mkdtemp(), "fingerprints.db"))),
+    ]
+    print(f"{'index':>8} {'fill s':>8} {'p50 ms':>8} {'p95 ms':>8} {'found':>7} {'false':>7}")
+    for name, index in indexes:
+        start = time.perf_counter()
+        index.add_many(filler + originals)
+        fill_seconds = time.perf_counter() - start
+        timings, found, false = [], 0, 0
+        for case, (sig, summary), expected in lookups:
+            start = time.perf_counter()
+            match = index.query(sig, summary)
+            timings.append((time.perf_counter() - start) * 1000)
+            got = match and match["cache_key"]
+            if expected is not None and got == expected:
+                found += 1
+            elif got != expected:
+                false += got is not None
+                failures.append(f"{name}, {case}: expected {expected}, found {got}")
+        p95 = percentile(timings, 95)
+        print(f"{name:>8} {fill_seconds:>8.1f} {percentile(timings, 50):>8.3f} {p95:>8.3f} "
+              f"{found:>3}/{args.statements:<3} {false:>7}")
+        if p95 > args.max_ms:
+            failures.append(f"{name}: p95 {p95:.3f} ms")
+
+    if failures:
+        for failure in failures[:10]:
+            print(f"❌ {failure}")
+        return 1
+    print(f"✅ Every copy found, no false matches, p95 within {args.max_ms} ms over {args.count + args.statements:,} fingerprints")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
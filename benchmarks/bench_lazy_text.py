@@ -0,0 +1,47 @@
+"""
+Benchmark for page-lazy text extraction
+Usage: python -m benchmarks.bench_lazy_text [pages ...]
+
+Parses synthetic statements with GenericParser, which stops reading pages
+once every field is pinned down, and compares it with extracting the whole
+document first.
+"""
+
+import sys
+import time
+
+from benchmarks.synthetic import make_statement_pdf
+from parsers.bank_parsers import GenericParser
+from parsers.document import Document
+from parsers.extraction import extract_fields
+
+DEFAULT_PAGES = [1, 10, 40, 200]
+
+
+def best_of(func, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(pages_list):
+    print(f"{'pages':>6} {'read':>6} {'whole doc ms':>13} {'lazy ms':>9} {'speedup':>8}")
+    for pages in pages_list:
+        data = make_statement_pdf(pages)
+
+        eager, expected = best_of(lambda: extract_fields(Document(data).text))
+        lazy, result = best_of(lambda: GenericParser(data).parse())
+        meta = result.pop("_meta")
+        if result != expected:
+            print(f"❌ Output mismatch on {pages}-page statement")
+            return 1
+        print(f"{pages:>6} {meta['pages_read']:>6} {eager * 1000:>13.2f} {lazy * 1000:>9.2f} {eager / lazy:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]] or DEFAULT_PAGES
+    sys.exit(main(args))
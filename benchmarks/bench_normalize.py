@@ -0,0 +1,82 @@
+"""
+Throughput of amount and date normalization for typed records
+Usage: python -m benchmarks.bench_normalize [--count 1000000] [--dateutil-count 100000]
+
+Normalizes count amount strings and count date strings in the formats the
+cascades return with parsers.record, and, for comparison, a smaller number
+of the same dates with dateutil.parser.parse(dayfirst=True). Also checks
+that both give the same dates.
+"""
+
+import argparse
+import datetime
+import random
+import sys
+import time
+
+from parsers.record import MISSING, parse_amount, parse_date, parse_date_range
+
+DATE_FORMATS = ["{d:02d} {mon} {y}", "{d:02d}-{mon}-{y}", "{d:02d}/{m:02d}/{y}", "{d:02d}/{m:02d}/{yy:02d}",
+                "{d} {month} {y}", "{d:02d}-{m:02d}-{y}"]
+
+
+def make_amounts(count, seed=0):
+    rng = random.Random(seed)
+    return [f"₹{rng.randint(0, 500_000):,}.{rng.randint(0, 99):02d}" for _ in range(count)]
+
+
+def make_dates(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2015, 1, 1).toordinal()
+    dates = []
+    for _ in range(count):
+        day = datetime.date.fromordinal(start + rng.randint(0, 4000))
+        dates.append(rng.choice(DATE_FORMATS).format(
+            d=day.day, m=day.month, y=day.year, yy=day.year % 100,
+            mon=day.strftime("%b"), month=day.strftime("%B"),
+        ))
+    return dates
+
+
+def rate(func, values):
+    """(values per second, results)"""
+    start = time.perf_counter()
+    results = list(map(func, values))
+    return len(values) / (time.perf_counter() - start), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_normalize", description="Normalization throughput")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--dateutil-count", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    amounts = make_amounts(args.count)
+    dates = make_dates(args.count)
+    ranges = [f"{a} - {b}" for a, b in zip(dates, dates[1:] + dates[:1])]
+
+    amount_rate, paise = rate(parse_amount, amounts)
+    date_rate, parsed = rate(parse_date, dates)
+    range_rate, _ = rate(parse_date_range, ranges)
+    print(f"💰 amounts: {args.count:,} at {amount_rate:,.0f}/sec, {paise.count(MISSING)} missing")
+    print(f"📅 dates: {args.count:,} at {date_rate:,.0f}/sec, {parsed.count(MISSING)} missing")
+    print(f"📅 billing cycles: {args.count:,} at {range_rate:,.0f}/sec")
+
+    try:
+        from dateutil import parser as dateutil_parser
+    except ImportError:
+        print("⚠️  dateutil not installed, skipping the comparison")
+        return 0
+    sample = dates[:args.dateutil_count]
+    dateutil_rate, reference = rate(lambda text: dateutil_parser.parse(text, dayfirst=True).date(), sample)
+    differ = sum(1 for ours, theirs in zip(parsed, reference) if ours != theirs)
+    print(f"🐢 dateutil: {len(sample):,} at {dateutil_rate:,.0f}/sec ({date_rate / dateutil_rate:.0f}x slower)")
+    if differ:
+        print(f"❌ {differ} dates differ from dateutil")
+        return 1
+    print("✅ Same dates as dateutil")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Speedup of reading one large statement across worker processes
+Usage: python -m benchmarks.bench_parallel_pages [--pages 64 128 256 500] [--workers 1 2 4 8] [--repeat 3]
+
+Reads the text of synthetic statements of each page count with each
+number of workers (1 reads in place, as below PDF_PARALLEL_PAGES) and
+prints the time to the first page, the time to the whole text and the
+speedup over one worker. Also checks that every run gives the same text
+and that the statement still parses to the expected fields.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.synthetic import expected_fields, make_statement_pdf
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import Document
+from parsers.parallel import pool
+
+
+def timed_read(data, workers):
+    """(seconds to the first page, seconds to the whole text, text)"""
+    start = time.perf_counter()
+    document = Document(data, page_budget=None, time_budget=None, text_budget=None, workers=workers)
+    document.prefix(1)
+    first = time.perf_counter() - start
+    text = document.text
+    return first, time.perf_counter() - start, text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_parallel_pages", description="Page-parallel reading")
+    parser.add_argument("--pages", type=int, nargs="*", default=[64, 128, 256, 500])
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    print(f"🖥️  {cpus} CPUs")
+    if cpus == 1:
+        print("⚠️  One CPU: worker processes can only add overhead here")
+    # Start every pool up front, so process start-up is not timed
+    for workers in args.workers:
+        if workers > 1:
+            for future in [pool(workers).submit(os.getpid) for _ in range(workers)]:
+                future.result()
+
+    failures = []
+    print(f"{'pages':>6} {'workers':>8} {'first ms':>9} {'total ms':>9} {'speedup':>8}")
+    for pages in args.pages:
+        data = make_statement_pdf(pages, seed=pages)
+        reference, baseline = None, None
+        for workers in args.workers:
+            best_first, best_total = float("inf"), float("inf")
+            for _ in range(args.repeat):
+                first, total, text = timed_read(data, workers)
+                best_first, best_total = min(best_first, first), min(best_total, total)
+            if reference is None:
+                reference, baseline = text, best_total
+            elif text != reference:
+                failures.append(f"{pages} pages, {workers} workers: text differs from reading in place")
+            print(f"{pages:>6} {workers:>8} {best_first * 1000:>9.1f} {best_total * 1000:>9.1f} "
+                  f"{baseline / best_total:>7.2f}x")
+        result = detect_bank_and_parse(Document(data, page_budget=None, workers=max(args.workers)))
+        result.pop("_meta", None)
+        if result != expected_fields(seed=pages):
+            failures.append(f"{pages} pages: fields differ with {max(args.workers)} workers")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Same text and fields with every number of workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Worst-case regex time against document size
+Usage: python -m benchmarks.bench_regex_stress [--sizes 25000 50000 100000 200000] [--max-growth 3]
+
+Runs the generic field cascades and every bank parser's patterns over the
+adversarial texts from benchmarks.synthetic at doubling sizes, plus random
+mixes of the characters the patterns care about, with the per-field
+deadline switched off so the engine itself is measured. Fails (exit code 1)
+if, on average, doubling the size more than max-growth-folds the time,
+i.e. if any pattern is worse than linear in the size of the document.
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+from benchmarks.synthetic import adversarial_texts
+from parsers import extraction
+from parsers.bank_parsers import BANK_PARSERS
+from parsers.document import Document
+from parsers.extraction import extract_fields
+
+# Below this many milliseconds timer noise dominates, so growth is not judged
+MIN_MS = 5.0
+# Characters labels, masks, amounts and dates are built from
+FUZZ_ALPHABET = "XxNameCardTotalDueRs:0123456789 ,.-/*\n\t"
+FUZZ_WORDS = ["Name", "Card Number", "Total Due", "Due Date", "Statement Period", "xxxx", "Rs.", "ending in"]
+
+
+def fuzz_texts(size, seed=0):
+    """(name, text) pairs of random text that keeps hitting anchors"""
+    rng = random.Random(seed)
+    yield "fuzz_characters", "".join(rng.choice(FUZZ_ALPHABET) for _ in range(size))
+    parts, length = [], 0
+    while length < size:
+        part = rng.choice(FUZZ_WORDS) + rng.choice([" ", ":", "\n", "X" * rng.randint(1, 40), ""])
+        parts.append(part)
+        length += len(part)
+    yield "fuzz_labels", "".join(parts)
+
+
+def bank_parsers_on(text):
+    """Each distinct bank parser class, reading text instead of a PDF"""
+    for parser_class in dict.fromkeys(BANK_PARSERS.values()):
+        yield parser_class(Document.from_pages([text]))
+
+
+def best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def time_text(text, repeat):
+    """Milliseconds for the generic cascades and for all bank parsers on text"""
+    generic = best_ms(lambda: extract_fields(text), repeat)
+    parsers = list(bank_parsers_on(text))
+    banks = best_ms(lambda: [parser.parse() for parser in parsers], repeat)
+    return generic, banks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_regex_stress", description="Regex stress test")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[25_000, 50_000, 100_000, 200_000])
+    parser.add_argument("--max-growth", type=float, default=3.0, help="allowed time ratio per doubling")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    extraction.FIELD_DEADLINE = float("inf")
+    sizes = sorted(args.sizes)
+    cases = {}
+    for size in sizes:
+        for name, text in list(adversarial_texts(size)) + list(fuzz_texts(size)):
+            cases.setdefault(name, []).append(time_text(text, args.repeat))
+
+    failures = []
+    print(f"{'case':>26} {'part':>8} " + " ".join(f"{size:>10}" for size in sizes) + "   growth")
+    for name, timings in cases.items():
+        for column, part in enumerate(("generic", "banks")):
+            values = [timing[column] for timing in timings]
+            growth = None
+            if len(values) > 1 and values[-1] >= MIN_MS and values[0] > 0:
+                # Average growth per doubling from the smallest to the largest size
+                doublings = math.log2(sizes[-1] / sizes[0])
+                growth = (values[-1] / values[0]) ** (1 / doublings)
+            flag = ""
+            if growth is not None and growth > args.max_growth:
+                flag = "  ❌"
+                failures.append(f"{name} ({part}) grows {growth:.1f}x per doubling")
+            shown = f"{growth:.1f}x" if growth is not None else "-"
+            print(f"{name:>26} {part:>8} " + " ".join(f"{ms:>10.2f}" for ms in values) + f"   {shown}{flag}")
+
+    if failures:
+        print("❌ Superlinear patterns:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print(f"✅ Every case stays within {args.max_growth}x per doubling of the size")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
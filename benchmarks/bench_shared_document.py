@@ -0,0 +1,57 @@
+"""
+Cost of running every parser class over one statement
+Usage: python -m benchmarks.bench_shared_document [pdf ...]
+
+Compares building each parser from the file path, which reads the PDF once
+per parser, with building them all on one shared Document.
+"""
+
+import glob
+import sys
+import time
+
+from parsers.bank_parsers import (
+    HDFCParser, ICICIParser, SBIParser, AxisParser, AmexParser, PNBParser, GenericParser,
+)
+from parsers.document import Document
+
+PARSERS = [HDFCParser, ICICIParser, SBIParser, AxisParser, AmexParser, PNBParser, GenericParser]
+
+
+def run_all(make_source):
+    results = []
+    for parser_class in PARSERS:
+        result = parser_class(make_source()).parse()
+        result.pop("_meta", None)
+        results.append(result)
+    return results
+
+
+def best_of(func, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(paths):
+    print(f"{'document':>22} {'per parser ms':>14} {'shared ms':>10} {'speedup':>8}")
+    for path in paths:
+        separate, expected = best_of(lambda: run_all(lambda: path))
+
+        def shared():
+            document = Document(path)
+            return run_all(lambda: document)
+
+        together, results = best_of(shared)
+        if results != expected:
+            print(f"❌ Output mismatch on {path}")
+            return 1
+        print(f"{path:>22} {separate * 1000:>14.2f} {together * 1000:>10.2f} {separate / together:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or sorted(glob.glob("sample/*.pdf"))))
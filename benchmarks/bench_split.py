@@ -0,0 +1,85 @@
+"""
+Parsing a combined PDF of several statements
+Usage: python -m benchmarks.bench_split [--parts 80 50 40 30] [--workers N]
+
+Builds one PDF from synthetic statements of the given page counts, then
+times split_and_parse() on it against parsing each statement's own PDF
+one after another (the sum) and parsing the largest one alone, and checks
+every statement's fields and page range. The check is repeated on the same
+statements with their summary header printed at the top of every page,
+which must not split them any further.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.synthetic import expected_fields, make_combined_pdf, make_statement_pdf
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.segments import split_and_parse
+
+BANKS = ["HDFC Bank", "ICICI Bank", "SBI Card", "American Express"]
+
+
+def best_of(func, repeat=3):
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def check_records(records, parts):
+    """Failures of split_and_parse() records against the statements in parts"""
+    failures = []
+    if len(records) != len(parts):
+        failures.append(f"found {len(records)} statements, expected {len(parts)}")
+    first = 1
+    for record, (pages, seed, bank) in zip(records, parts):
+        expected_pages = [first, first + pages - 1]
+        first += pages
+        result = dict(record.get("result") or {})
+        result.pop("_meta", None)
+        if record["pages"] != expected_pages:
+            failures.append(f"pages {record['pages']}, expected {expected_pages}")
+        elif result != expected_fields(seed, bank):
+            failures.append(f"pages {record['pages']}: {record.get('error') or result}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_split", description="Combined PDF splitting")
+    parser.add_argument("--parts", type=int, nargs="*", default=[80, 50, 40, 30], help="pages per statement")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    parts = [(pages, seed, BANKS[seed % len(BANKS)]) for seed, pages in enumerate(args.parts, 1)]
+    combined = make_combined_pdf(parts)
+    singles = [make_statement_pdf(*part) for part in parts]
+
+    split_seconds, records = best_of(lambda: split_and_parse(combined, workers=args.workers))
+    sum_seconds, _ = best_of(lambda: [detect_bank_and_parse(data) for data in singles])
+    largest = max(range(len(parts)), key=lambda index: parts[index][0])
+    largest_seconds, _ = best_of(lambda: detect_bank_and_parse(singles[largest]))
+
+    failures = check_records(records, parts)
+    repeated = split_and_parse(make_combined_pdf(parts, repeat_header=True), workers=args.workers)
+    failures += [f"header on every page, {failure}" for failure in check_records(repeated, parts)]
+
+    print(f"📚 {sum(args.parts)} pages, {len(parts)} statements, {args.workers} workers")
+    print(f"   split_and_parse   {split_seconds * 1000:>9.1f} ms")
+    print(f"   one by one (sum)  {sum_seconds * 1000:>9.1f} ms")
+    print(f"   largest alone     {largest_seconds * 1000:>9.1f} ms ({parts[largest][0]} pages)")
+    print(f"   split / largest   {split_seconds / largest_seconds:>9.2f}x")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Every statement found with the right pages and fields, with and without a header on every page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Query latency of the statement store at scale
+Usage: python -m benchmarks.bench_store [--rows 1000000] [--queries 200] [--max-ms 10] [--db PATH]
+
+Fills a statement store with synthetic results through the bulk writer,
+then times the queries /api/statements serves: by bank, by card and due
+week, by due week, by billing cycle, and pages deep into the table by
+keyset. Fails (exit code 1) if any query's p95 is above max-ms.
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import percentile
+from parsers.extraction import BANK_PATTERNS
+from parsers.record import format_date
+from parsers.store import StatementStore
+
+BANKS = sorted({name for _, _, name in BANK_PATTERNS})
+FIRST_CYCLE = datetime.date(2015, 1, 1)
+CYCLES = 130
+
+
+def cycle(index):
+    """(start, end) of the index-th monthly billing cycle"""
+    year, month = divmod(FIRST_CYCLE.month - 1 + index, 12)
+    start = datetime.date(FIRST_CYCLE.year + year, month + 1, 1)
+    following = datetime.date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start, following - datetime.timedelta(days=1)
+
+
+def make_result(rng):
+    start, end = cycle(rng.randrange(CYCLES))
+    return {
+        "Bank": rng.choice(BANKS),
+        "Cardholder": "Card Holder",
+        "Card Last 4 Digits": f"{rng.randrange(10000):04d}",
+        "Billing Cycle": f"{format_date(start)} - {format_date(end)}",
+        "Total Due": f"₹{rng.randrange(10_000_000):,}.{rng.randrange(100):02d}",
+        "Payment Due Date": format_date(end + datetime.timedelta(days=20)),
+    }
+
+
+def fill(store, rows, seed=0):
+    rng = random.Random(seed)
+    with store.bulk() as writer:
+        for index in range(rows):
+            writer.add(f"{index:064x}", make_result(rng), f"statement-{index}.pdf")
+
+
+def week(rng):
+    start = cycle(rng.randrange(CYCLES))[1] + datetime.timedelta(days=rng.randrange(14, 28))
+    return start.isoformat(), (start + datetime.timedelta(days=6)).isoformat()
+
+
+def queries(rows, rng):
+    """name -> function returning query() keyword arguments"""
+    def card_due():
+        due_from, due_to = week(rng)
+        return {"card_last4": f"{rng.randrange(10000):04d}", "due_from": due_from, "due_to": due_to}
+
+    def due():
+        due_from, due_to = week(rng)
+        return {"due_from": due_from, "due_to": due_to}
+
+    def billing_cycle():
+        start, end = cycle(rng.randrange(CYCLES))
+        return {"cycle_from": start.isoformat(), "cycle_to": end.isoformat()}
+
+    return {
+        "bank": lambda: {"bank": rng.choice(BANKS)},
+        "bank_deep_page": lambda: {"bank": rng.choice(BANKS), "after": rng.randrange(rows)},
+        "card_due_week": card_due,
+        "due_week": due,
+        "billing_cycle": billing_cycle,
+        "deep_page": lambda: {"after": rng.randrange(rows)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_store", description="Statement store queries")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per kind")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument("--max-ms", type=float, default=10.0, help="allowed p95 per kind of query")
+    parser.add_argument("--db", help="reuse or keep this database instead of a temporary one")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "statements.db")
+    store = StatementStore(path)
+    existing = store.stats()["statements"]
+    if existing < args.rows:
+        start = time.perf_counter()
+        fill(store, args.rows - existing, seed=existing)
+        elapsed = time.perf_counter() - start
+        print(f"💾 inserted {args.rows - existing:,} rows in {elapsed:.1f}s "
+              f"({(args.rows - existing) / elapsed:,.0f} rows/sec)")
+    rows = store.stats()["statements"]
+    print(f"📊 {rows:,} statements in {path}")
+
+    rng = random.Random(1)
+    failures = []
+    print(f"{'query':>16} {'p50 ms':>9} {'p95 ms':>9} {'rows':>6}")
+    for name, make_args in queries(rows, rng).items():
+        timings, returned = [], 0
+        for _ in range(args.queries):
+            kwargs = make_args()
+            start = time.perf_counter()
+            statements, _ = store.query(limit=args.limit, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+            returned += len(statements)
+        p95 = percentile(timings, 95)
+        print(f"{name:>16} {percentile(timings, 50):>9.3f} {p95:>9.3f} {returned / args.queries:>6.1f}")
+        if p95 > args.max_ms:
+            failures.append(f"{name}: p95 {p95:.2f} ms")
+
+    if failures:
+        print("❌ Slower than the budget:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print(f"✅ Every query's p95 is within {args.max_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
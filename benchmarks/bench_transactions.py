@@ -0,0 +1,43 @@
+"""
+Throughput of transaction table extraction
+Usage: python -m benchmarks.bench_transactions [pages ...]
+
+Reports rows/sec over the sample/ PDFs and over synthetic statements of
+the given page counts.
+"""
+
+import glob
+import sys
+import time
+
+from benchmarks.synthetic import make_statement_pdf
+from parsers.document import Document
+from parsers.transactions import extract_transactions
+
+DEFAULT_PAGES = [10, 100, 500]
+
+
+def measure(data, repeat=3):
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(extract_transactions(Document(data)))
+        best = min(best, time.perf_counter() - start)
+    return rows, best
+
+
+def main(pages_list):
+    print(f"{'document':>22} {'rows':>7} {'ms':>9} {'rows/sec':>10}")
+    for path in sorted(glob.glob("sample/*.pdf")):
+        with open(path, "rb") as f:
+            rows, elapsed = measure(f.read(), repeat=10)
+        print(f"{path:>22} {rows:>7} {elapsed * 1000:>9.2f} {rows / elapsed:>10.0f}")
+    for pages in pages_list:
+        rows, elapsed = measure(make_statement_pdf(pages))
+        print(f"{f'synthetic {pages}p':>22} {rows:>7} {elapsed * 1000:>9.2f} {rows / elapsed:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]] or DEFAULT_PAGES
+    sys.exit(main(args))
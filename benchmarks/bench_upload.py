@@ -0,0 +1,159 @@
+"""
+Server memory under concurrent large uploads
+Usage: python -m benchmarks.bench_upload [--size-mb 100] [--concurrency 4] [--rounds 2] [--max-growth-mb 64]
+
+Writes a synthetic statement padded to size-mb, starts the app in a
+threaded Werkzeug server in a subprocess, and posts the file to /api/parse
+from concurrency clients at once, streaming each request body from disk.
+The server's resident memory is sampled throughout, once with uploads
+spooled to disk as deployed and once with UPLOAD_SPOOL_BYTES so large that
+every upload stays in memory, as file.read() used to. Fails (exit code 1)
+if the spooled server grows by more than max-growth-mb of anonymous
+memory. Needs Linux for /proc.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.synthetic import expected_fields, write_large_statement_pdf
+
+SEED, BANK = 7, "HDFC Bank"
+
+SERVER = """
+import sys
+from werkzeug.serving import make_server
+from app import app
+server = make_server("127.0.0.1", 0, app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def memory(pid):
+    """(anonymous, total) resident MB of a process"""
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "VmRSS"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields["RssAnon"], fields["VmRSS"]
+
+
+def post(port, path):
+    """Stream the file at path to /api/parse as a multipart upload; (status, JSON)"""
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"statement.pdf\"\r\n"
+            "Content-Type: application/pdf\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    def body():
+        yield head
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(256 * 1024), b""):
+                yield chunk
+        yield tail
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    connection.request("POST", "/api/parse", body=body(), headers={
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + os.path.getsize(path) + len(tail)),
+    })
+    response = connection.getresponse()
+    data = json.loads(response.read())
+    connection.close()
+    return response.status, data
+
+
+def run(path, small_path, concurrency, rounds, spool_bytes=None):
+    """Peak anonymous and total MB above the idle server, seconds per round, and failures"""
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), RESULT_CACHE_SIZE="0")
+    env.pop("RESULT_CACHE_DB", None)
+    env.pop("STATEMENT_DB", None)
+    if spool_bytes is not None:
+        env["UPLOAD_SPOOL_BYTES"] = str(spool_bytes)
+    server = subprocess.Popen([sys.executable, "-c", SERVER], env=env, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = int(server.stdout.readline())
+        post(port, small_path)  # imports and warm-up
+        idle_anon, idle_total = memory(server.pid)
+        peak = [idle_anon, idle_total]
+        done = threading.Event()
+
+        def sample():
+            while not done.is_set():
+                anon, total = memory(server.pid)
+                peak[0], peak[1] = max(peak[0], anon), max(peak[1], total)
+                time.sleep(0.005)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        failures, seconds = [], []
+        expected = expected_fields(SEED, BANK)
+        for _ in range(rounds):
+            results = []
+            clients = [threading.Thread(target=lambda: results.append(post(port, path))) for _ in range(concurrency)]
+            start = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            seconds.append(time.perf_counter() - start)
+            for status, data in results:
+                data.pop("_meta", None)
+                if status != 200 or data != expected:
+                    failures.append(f"{status}: {data}")
+        done.set()
+        sampler.join()
+        return peak[0] - idle_anon, peak[1] - idle_total, min(seconds), failures
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_upload", description="Large upload memory")
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--max-growth-mb", type=float, default=64.0, help="allowed anonymous memory growth, spooled")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "large.pdf")
+    small_path = os.path.join(directory, "small.pdf")
+    write_large_statement_pdf(path, args.size_mb * 1024 * 1024, seed=SEED, bank=BANK)
+    write_large_statement_pdf(small_path, 0, seed=SEED, bank=BANK)
+    print(f"📦 {os.path.getsize(path) / 2**20:.0f} MB statement, {args.concurrency} concurrent uploads")
+
+    print(f"{'mode':>10} {'anon MB':>9} {'rss MB':>9} {'round s':>9} {'MB/s':>7}")
+    failures = []
+    growth = {}
+    for mode, spool_bytes in (("spooled", None), ("in memory", 2**62)):
+        anon, total, seconds, errors = run(path, small_path, args.concurrency, args.rounds, spool_bytes)
+        growth[mode] = anon
+        throughput = args.size_mb * args.concurrency / seconds
+        print(f"{mode:>10} {anon:>9.1f} {total:>9.1f} {seconds:>9.2f} {throughput:>7.0f}")
+        failures.extend(f"{mode}: {error}" for error in errors)
+
+    if growth["spooled"] > args.max_growth_mb:
+        failures.append(f"spooled uploads grew the server by {growth['spooled']:.1f} MB")
+    if failures:
+        for failure in failures[:10]:
+            print(f"❌ {failure}")
+        return 1
+    print(f"✅ Spooled uploads stayed within {args.max_growth_mb} MB of anonymous memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Speed and field accuracy of every text-extraction backend
+Usage: python -m benchmarks.calibrate_backends [--corpus sample] [--pages 1 10 100] [--repeat 3]
+                                               [--output calibration.json]
+
+Parses every PDF in the corpus that benchmarks/golden.json has fields
+for, plus synthetic statements of the given page counts, once per
+available backend in parsers.backends, and compares the fields with the
+expected ones. Prints a table, writes it as JSON with --output, and names
+the most accurate backend (the fastest of equals) to set as TEXT_BACKEND.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from benchmarks.suite import GOLDEN, field_score
+from benchmarks.synthetic import expected_fields, make_statement_pdf
+from parsers.backends import DEFAULT_BACKEND, available_backends
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import Document
+
+
+def corpus(directory, pages_list):
+    """(name, PDF bytes, expected fields) of the corpus PDFs with golden fields, then the synthetic ones"""
+    with open(GOLDEN, encoding="utf-8") as f:
+        golden = json.load(f)
+    items = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.pdf"))):
+        expected = golden.get(path) or golden.get(os.path.relpath(path))
+        if expected is not None:
+            with open(path, "rb") as f:
+                items.append((path, f.read(), expected))
+    for pages in pages_list:
+        items.append((f"synthetic-{pages}p", make_statement_pdf(pages, seed=pages), expected_fields(seed=pages)))
+    return items
+
+
+def calibrate(backend, items, repeat):
+    """Accuracy, seconds and pages read over items with one backend"""
+    matched = total = pages = 0
+    seconds = 0.0
+    mismatches = []
+    for name, data, expected in items:
+        best, result = float("inf"), None
+        for _ in range(repeat):
+            document = Document(data, backend=backend)
+            start = time.perf_counter()
+            try:
+                result = detect_bank_and_parse(document)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            best = min(best, time.perf_counter() - start)
+        good, count = field_score(result, expected)
+        matched += good
+        total += count
+        pages += document.page_count or 0
+        seconds += best
+        if good < count:
+            mismatches.append(name)
+    return {
+        "backend": backend,
+        "accuracy": round(matched / total, 4) if total else None,
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.calibrate_backends", description="Text backend calibration")
+    parser.add_argument("--corpus", default="sample", help="directory of PDFs listed in benchmarks/golden.json")
+    parser.add_argument("--pages", type=int, nargs="*", default=[1, 10, 100], help="synthetic statements to add")
+    parser.add_argument("--repeat", type=int, default=3, help="timed parses per document, best kept")
+    parser.add_argument("--output", help="write the results here as JSON")
+    args = parser.parse_args(argv)
+
+    items = corpus(args.corpus, args.pages)
+    if not items:
+        print("No documents to calibrate with", file=sys.stderr)
+        return 1
+    print(f"📚 {len(items)} documents, {sum(len(data) for _, data, _ in items) / 1024:.0f} KB")
+
+    results = [calibrate(backend, items, args.repeat) for backend in available_backends()]
+    print(f"{'backend':>16} {'accuracy':>9} {'seconds':>9} {'pages/s':>9}  mismatches")
+    for result in results:
+        print(f"{result['backend']:>16} {result['accuracy']:>9.2%} {result['seconds']:>9.3f} "
+              f"{result['pages_per_sec']:>9.0f}  {', '.join(result['mismatches']) or '-'}")
+
+    best = min(results, key=lambda result: (-result["accuracy"], result["seconds"]))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"documents": [name for name, _, _ in items], "backends": results, "best": best["backend"]}, f, indent=2)
+    if best["backend"] == DEFAULT_BACKEND:
+        print(f"✅ The default backend, {DEFAULT_BACKEND}, is the best choice")
+    else:
+        print(f"💡 Set TEXT_BACKEND={best['backend']} (currently {DEFAULT_BACKEND})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
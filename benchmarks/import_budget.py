@@ -0,0 +1,76 @@
+"""
+Import-time budget for a cold start
+Usage: python -m benchmarks.import_budget [--budget-ms 500] [--parsers-budget-ms 50]
+
+Imports app in a fresh interpreter under `python -X importtime` and fails
+(exit code 1) if the whole import, or the parsers package's share of it,
+takes longer than its budget, or if any module that should load lazily
+(PyMuPDF, pdfminer, pandas, multiprocessing, sqlite3) was imported. The
+fastest of a few runs counts, to keep scheduling noise out.
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Modules only the first PDF, a pdfminer fallback, a batch or a SQLite
+# cache should load; the names as -X importtime prints them
+LAZY_MODULES = ["fitz", "pymupdf", "pdfminer", "pandas", "multiprocessing", "sqlite3"]
+
+
+def measure(code):
+    """(depth, module name, cumulative microseconds) for each import code makes in a fresh interpreter"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            # One space after the bar, then two more per level of nesting
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            imports.append((depth, name.strip(), int(cumulative)))
+    return imports
+
+
+def parsers_share(modules):
+    """Microseconds the parsers modules take once Flask is already imported"""
+    imports = measure("import flask, flask_cors; import " + ", ".join(modules))
+    return sum(us for depth, name, us in imports if depth == 0 and name.startswith("parsers"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_budget", description="Import-time budget")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="whole import")
+    parser.add_argument("--parsers-budget-ms", type=float, default=50.0, help="parsers modules once Flask is loaded")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    runs = [measure(f"import {args.module}") for _ in range(args.runs)]
+    total_ms = min(sum(us for depth, name, us in run if depth == 0 and name == args.module) for run in runs) / 1000
+    modules = sorted({name for depth, name, us in runs[0] if name.startswith("parsers.")})
+    parsers_ms = min(parsers_share(modules) for _ in range(args.runs)) / 1000 if modules else 0.0
+    loaded = sorted({name.split(".")[0] for depth, name, us in runs[0]} & set(LAZY_MODULES))
+
+    print(f"⏱️  import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"⏱️  parsers modules: {parsers_ms:.1f} ms (budget {args.parsers_budget_ms:.0f} ms)")
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} takes {total_ms:.1f} ms")
+    if parsers_ms > args.parsers_budget_ms:
+        failures.append(f"parsers modules take {parsers_ms:.1f} ms")
+    for name in loaded:
+        failures.append(f"{name} is imported at startup")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Within budget, no heavy modules loaded at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
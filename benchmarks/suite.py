@@ -0,0 +1,299 @@
+"""
+Benchmark and regression suite
+Usage: python -m benchmarks.suite [--save] [--baseline PATH] [--threshold 0.25]
+                                  [--pages 1 10 100 500] [--repeat N]
+                                  [--load REQUESTS] [--concurrency N]
+
+Runs detect_bank_and_parse over sample/*.pdf and checks every field
+against benchmarks/golden.json, parses synthetic statements of the given
+page counts against the values they were generated with, and times the
+field cascades on adversarial text at two sizes (a growth well above 2x
+between them means the time is not linear). Reports p50/p95 per parsing
+stage, docs/sec and peak RSS.
+
+With --save the report becomes the new baseline. Otherwise it is compared
+with the baseline and the run fails (exit code 1) if throughput, latency
+or memory get worse by more than the threshold, or field accuracy drops.
+--load also load-tests /api/parse through the Flask test client.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import adversarial_texts, expected_fields, make_statement_pdf
+from parsers import telemetry
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.extraction import extract_fields
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN = os.path.join(HERE, "golden.json")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+DEFAULT_PAGES = [1, 10, 100, 500]
+# Small enough that a quadratic cascade still finishes in seconds
+ADVERSARIAL_SIZE = 2000
+# Absolute slack in milliseconds, so timer noise on tiny numbers never fails a run
+SLACK_MS = 1.0
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def field_score(result, expected):
+    """(fields matching, fields expected)"""
+    result = dict(result or {})
+    result.pop("_meta", None)
+    return sum(1 for key, value in expected.items() if result.get(key) == value), len(expected)
+
+
+def run_samples(repeat):
+    with open(GOLDEN, encoding="utf-8") as f:
+        golden = json.load(f)
+    blobs = []
+    for path in sorted(glob.glob("sample/*.pdf")):
+        with open(path, "rb") as f:
+            blobs.append((path, f.read()))
+
+    matched = total = 0
+    mismatches = []
+    start = time.perf_counter()
+    for round_number in range(repeat):
+        for path, data in blobs:
+            result = detect_bank_and_parse(data)
+            if round_number == 0 and path in golden:
+                good, count = field_score(result, golden[path])
+                matched += good
+                total += count
+                if good < count:
+                    mismatches.append(path)
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(blobs),
+        "docs_per_sec": round(len(blobs) * repeat / elapsed, 1),
+        "accuracy": round(matched / total, 4) if total else None,
+        "mismatches": mismatches,
+    }
+
+
+def run_synthetic(pages_list):
+    timings, matched, total = {}, 0, 0
+    for pages in pages_list:
+        data = make_statement_pdf(pages, seed=pages)
+        best, result = float("inf"), None
+        for _ in range(5 if pages <= 100 else 2):
+            start = time.perf_counter()
+            result = detect_bank_and_parse(data)
+            best = min(best, time.perf_counter() - start)
+        good, count = field_score(result, expected_fields(seed=pages))
+        matched += good
+        total += count
+        timings[str(pages)] = round(best * 1000, 2)
+    return {"ms": timings, "accuracy": round(matched / total, 4) if total else None}
+
+
+def run_adversarial(size):
+    timings, growth = {}, {}
+    small = dict(adversarial_texts(size))
+    large = dict(adversarial_texts(size * 2))
+    for name in small:
+        elapsed = []
+        for text in (small[name], large[name]):
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                extract_fields(text)
+                best = min(best, time.perf_counter() - start)
+            elapsed.append(best)
+        timings[name] = round(elapsed[1] * 1000, 2)
+        growth[name] = round(elapsed[1] / elapsed[0], 1) if elapsed[0] else None
+    return {"size": size * 2, "ms": timings, "growth": growth}
+
+
+def run_load(requests, concurrency):
+    """Post the samples to /api/parse from concurrency threads, result cache off"""
+    import app as server
+    from parsers.cache import ResultCache
+
+    server.result_cache = ResultCache(max_entries=0)
+    blobs = []
+    for path in sorted(glob.glob("sample/*.pdf")):
+        with open(path, "rb") as f:
+            blobs.append((os.path.basename(path), f.read()))
+
+    def worker(indexes):
+        client = server.app.test_client()
+        results = []
+        for index in indexes:
+            name, data = blobs[index % len(blobs)]
+            start = time.perf_counter()
+            response = client.post("/api/parse", data={"file": (__import__("io").BytesIO(data), name)})
+            results.append((response.status_code, time.perf_counter() - start))
+        return results
+
+    shares = [range(i, requests, concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = [item for share in pool.map(worker, shares) for item in share]
+    elapsed = time.perf_counter() - start
+    latencies = [seconds * 1000 for _, seconds in outcomes]
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "statuses": statuses,
+    }
+
+
+def stage_stats():
+    stats = {}
+    for (stage,), values in sorted(telemetry.STAGE_SECONDS.samples.items()):
+        stats[stage] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+        }
+    return stats
+
+
+def compare(report, baseline, threshold, accuracy_drop):
+    """Descriptions of every regression against the baseline"""
+    failures = []
+
+    def slower(label, now, before):
+        if before is not None and now is not None and now > before * (1 + threshold) + SLACK_MS:
+            failures.append(f"{label}: {now} ms, baseline {before} ms")
+
+    def less(label, now, before, allowed):
+        if before is not None and now is not None and now < before - allowed:
+            failures.append(f"{label}: {now}, baseline {before}")
+
+    samples, base_samples = report["samples"], baseline.get("samples", {})
+    less("sample docs/sec", samples["docs_per_sec"], base_samples.get("docs_per_sec"),
+         (base_samples.get("docs_per_sec") or 0) * threshold)
+    less("sample accuracy", samples["accuracy"], base_samples.get("accuracy", 1.0), accuracy_drop)
+    less("synthetic accuracy", report["synthetic"]["accuracy"],
+         baseline.get("synthetic", {}).get("accuracy"), accuracy_drop)
+    for pages, ms in report["synthetic"]["ms"].items():
+        slower(f"synthetic {pages}p", ms, baseline.get("synthetic", {}).get("ms", {}).get(pages))
+    base_adversarial = baseline.get("adversarial", {})
+    if base_adversarial.get("size") == report["adversarial"]["size"]:
+        for name, ms in report["adversarial"]["ms"].items():
+            slower(f"adversarial {name}", ms, base_adversarial.get("ms", {}).get(name))
+    for stage, stats in report["stages"].items():
+        slower(f"stage {stage} p95", stats["p95_ms"], baseline.get("stages", {}).get(stage, {}).get("p95_ms"))
+    rss, base_rss = report.get("peak_rss_mb"), baseline.get("peak_rss_mb")
+    if rss is not None and base_rss is not None and rss > base_rss * (1 + threshold):
+        failures.append(f"peak RSS: {rss} MB, baseline {base_rss} MB")
+    if "load" in report and "load" in baseline:
+        base_rps = baseline["load"]["requests_per_sec"]
+        less("load requests/sec", report["load"]["requests_per_sec"], base_rps, base_rps * threshold)
+    return failures
+
+
+def print_report(report):
+    samples = report["samples"]
+    print(f"📄 samples: {samples['documents']} documents, {samples['docs_per_sec']} docs/sec, "
+          f"accuracy {samples['accuracy']}")
+    for path in samples["mismatches"]:
+        print(f"   ❌ {path} differs from golden output")
+    synthetic = report["synthetic"]
+    print(f"📚 synthetic: accuracy {synthetic['accuracy']}")
+    for pages, ms in synthetic["ms"].items():
+        print(f"   {pages:>5} pages {ms:>10.2f} ms")
+    adversarial = report["adversarial"]
+    print(f"🧨 adversarial ({adversarial['size']} chars, growth from half size):")
+    for name, ms in adversarial["ms"].items():
+        growth = adversarial["growth"][name]
+        flag = "  ⚠️ superlinear" if growth and growth > 3 else ""
+        print(f"   {name:>26} {ms:>10.2f} ms {growth:>5}x{flag}")
+    print(f"⏱️  stages:")
+    print(f"   {'stage':>26} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, stats in report["stages"].items():
+        print(f"   {stage:>26} {stats['count']:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f}")
+    if "load" in report:
+        load = report["load"]
+        print(f"🌐 load: {load['requests']} requests x{load['concurrency']}: {load['requests_per_sec']} req/sec, "
+              f"p50 {load['p50_ms']} ms, p95 {load['p95_ms']} ms, statuses {load['statuses']}")
+    print(f"💾 peak RSS: {report['peak_rss_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Benchmark and regression suite")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--accuracy-drop", type=float, default=0.0, help="allowed drop in field accuracy")
+    parser.add_argument("--pages", type=int, nargs="*", default=DEFAULT_PAGES, help="synthetic page counts")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the sample corpus")
+    parser.add_argument("--adversarial-size", type=int, default=ADVERSARIAL_SIZE)
+    parser.add_argument("--load", type=int, default=0, metavar="REQUESTS", help="also load-test /api/parse")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if not glob.glob("sample/*.pdf"):
+        print("No sample PDFs found, run from the repository root")
+        return 1
+
+    telemetry.set_enabled(True)
+    telemetry.STAGE_SECONDS.samples = {}
+    report = {
+        "samples": run_samples(args.repeat),
+        "synthetic": run_synthetic(args.pages),
+        "adversarial": run_adversarial(args.adversarial_size),
+    }
+    if args.load:
+        report["load"] = run_load(args.load, args.concurrency)
+    report["stages"] = stage_stats()
+    report["peak_rss_mb"] = peak_rss_mb()
+    print_report(report)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️  No baseline at {args.baseline}; run with --save to create one")
+        return 1 if report["samples"]["mismatches"] else 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = compare(report, baseline, args.threshold, args.accuracy_drop)
+    if failures:
+        print("❌ Regressions against the baseline:")
+        for failure in failures:
+            print(f"   {failure}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
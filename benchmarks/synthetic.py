@@ -0,0 +1,180 @@
+"""
+Synthetic credit card statements for benchmarks.
+
+make_statement_pdf() writes a text-based PDF with a summary header on the
+first page followed by pages of transactions, laid out like the statements
+in sample/; expected_fields() gives the values a parser should find in it.
+make_combined_pdf() puts several of them into one file, and
+write_large_statement_pdf() pads one out to a given file size.
+adversarial_texts() yields text built to make the regex cascades work hard.
+"""
+
+import random
+
+import fitz  # PyMuPDF
+
+MERCHANTS = [
+    "AMAZON IN", "PAYTM UPI", "GROCERY - SPAR", "SAMSUNG ELECTRONICS",
+    "RAILWAYS - IRCTC", "STARBUCKS", "SWIGGY FOOD", "AIRTEL RECHARGE",
+    "FUEL - HPCL", "HOTEL - TAJ", "ZOMATO", "FLIPKART", "UBER TRIP",
+]
+
+HEADER = """{bank}
+Credit Card Statement
+Cardholder
+{name}
+Card Number
+XXXX-XXXX-XXXX-{last4}
+Statement Period
+01 Sep 2025 - 30 Sep 2025
+Total Due
+Rs. {total}
+Minimum Due
+Rs. {minimum}
+Payment Due Date 20 Oct 2025
+Transaction Details
+"""
+
+ROWS_PER_PAGE = 40
+COLUMNS_X = (62, 358, 409, 480)
+ROW_HEIGHT = 18
+DISTINCT_PAGES = 16
+
+
+def statement_rows(rng, count):
+    """Transaction rows (date and description, type, amount, balance) like the samples"""
+    rows = []
+    for _ in range(count):
+        day = rng.randint(1, 30)
+        ref = f" / REF: {rng.randint(1000000, 9999999)}" if rng.random() < 0.4 else ""
+        rows.append((
+            f"{day:02d}-Sep-2025{rng.choice(MERCHANTS)}{ref}",
+            rng.choice(["DR", "DR", "DR", "CR"]),
+            f"Rs.{rng.randint(100, 15000):,}.{rng.randint(0, 99):02d}",
+            f"Rs.{rng.randint(100, 50000):,}.{rng.randint(0, 99):02d}",
+        ))
+    return rows
+
+
+def _summary(rng, bank, total=None):
+    summary = {
+        "bank": bank,
+        "name": rng.choice(["Neha Singh", "Rahul Sharma", "Aman Gupta", "Vikram Rao"]),
+        "last4": f"{rng.randint(0, 9999):04d}",
+        "total": f"{rng.randint(1000, 50000):,}.{rng.randint(0, 99):02d}",
+        "minimum": f"{rng.randint(100, 2000):,}.{rng.randint(0, 99):02d}",
+    }
+    # Drawn either way, so the rest of the statement stays the same
+    if total is not None:
+        summary["total"] = total
+    return summary
+
+
+def expected_fields(seed=0, bank="HDFC Bank", total=None):
+    """Fields a parser should report for make_statement_pdf(..., seed, bank, total)"""
+    summary = _summary(random.Random(seed), bank, total)
+    return {
+        "Bank": bank,
+        "Cardholder": summary["name"],
+        "Card Last 4 Digits": summary["last4"],
+        "Billing Cycle": "01 Sep 2025 - 30 Sep 2025",
+        "Total Due": "₹" + summary["total"],
+        "Payment Due Date": "20 Oct 2025",
+    }
+
+
+def make_statement_pages(pages, seed=0, bank="HDFC Bank", total=None, repeat_header=False):
+    """
+    (header lines, transaction rows) for each page of a synthetic statement.
+    Transaction pages repeat after DISTINCT_PAGES, so long statements can
+    be built by copying pages instead of laying out every one. total, if
+    given, replaces the total due and leaves everything else as it was.
+    With repeat_header every page starts with the summary, not just the first.
+    """
+    rng = random.Random(seed)
+    header = HEADER.format(**_summary(rng, bank, total)).splitlines()
+    result = [(header, statement_rows(rng, ROWS_PER_PAGE - len(header) // 2))]
+    if repeat_header:
+        body = [(header, statement_rows(rng, ROWS_PER_PAGE - len(header) // 2))
+                for _ in range(min(pages - 1, DISTINCT_PAGES))]
+    else:
+        body = [([], statement_rows(rng, ROWS_PER_PAGE)) for _ in range(min(pages - 1, DISTINCT_PAGES))]
+    for index in range(pages - 1):
+        result.append(body[index % DISTINCT_PAGES])
+    return result
+
+
+def _write_page(doc, font, header, rows):
+    page = doc.new_page()
+    # One TextWriter per page; inserting cell by cell is far slower
+    writer = fitz.TextWriter(page.rect)
+    y = 40
+    for line in header:
+        writer.append((COLUMNS_X[0], y), line, font=font, fontsize=9)
+        y += 12
+    for row in rows:
+        y += ROW_HEIGHT
+        for x, cell in zip(COLUMNS_X, row):
+            writer.append((x, y), cell, font=font, fontsize=9)
+    writer.write_text(page)
+
+
+def make_statement_pdf(pages, seed=0, bank="HDFC Bank", total=None, repeat_header=False):
+    """Bytes of a synthetic statement PDF with the given number of pages"""
+    doc = fitz.open()
+    font = fitz.Font("helv")
+    layout = make_statement_pages(pages, seed, bank, total, repeat_header)
+    for header, rows in layout[:DISTINCT_PAGES + 1]:
+        _write_page(doc, font, header, rows)
+    if pages > DISTINCT_PAGES + 1:
+        distinct = fitz.open("pdf", doc.tobytes())
+        for index in range(DISTINCT_PAGES + 1, pages):
+            source = (index - 1) % DISTINCT_PAGES + 1
+            doc.insert_pdf(distinct, from_page=source, to_page=source)
+        distinct.close()
+    data = doc.tobytes(garbage=4, deflate=True)
+    doc.close()
+    return data
+
+
+def make_combined_pdf(parts, repeat_header=False):
+    """
+    Bytes of one PDF holding a synthetic statement for each (pages, seed,
+    bank) in parts, back to back
+    """
+    combined = fitz.open()
+    for pages, seed, bank in parts:
+        part = fitz.open("pdf", make_statement_pdf(pages, seed, bank, repeat_header=repeat_header))
+        combined.insert_pdf(part)
+        part.close()
+    data = combined.tobytes(garbage=4, deflate=True)
+    combined.close()
+    return data
+
+
+def write_large_statement_pdf(path, size, pages=20, seed=0, bank="HDFC Bank"):
+    """
+    Write a synthetic statement padded with an attachment of random bytes
+    to about size bytes, like a statement carrying large scanned inserts
+    """
+    doc = fitz.open("pdf", make_statement_pdf(pages, seed, bank))
+    padding = max(size - len(doc.tobytes()), 0)
+    doc.embfile_add("inserts.bin", random.Random(seed).randbytes(padding))
+    doc.save(path)
+    doc.close()
+
+
+def adversarial_texts(size=200_000):
+    """(name, text) pairs of about size characters aimed at the field cascades"""
+    yield "labels_without_values", "Card Number Statement Period Total Due Payment Due Date\n" * (size // 56)
+    yield "capitalized_words", "Aaaa Bbbb " * (size // 10)
+    yield "masked_digits", "X" * size
+    yield "whitespace_after_label", "Total Due" + " " * size + "\n"
+    yield "amount_without_decimals", "Total Due " + "1," * (size // 2)
+    yield "dates_without_range", "Statement Period 01 Sep 2025 to " * (size // 32)
+    yield "bank_names", "HDFC Bank ICICI Bank SBI Card American Express " * (size // 48)
+    yield "long_line", "a" * size
+    yield "blank_lines_after_label", "Name:" + "\n" * size
+    yield "blank_lines_before_amount", "Total Due\n" + " " * size
+    yield "masked_after_label", "Card Number: " + "X " * (size // 2)
+    yield "digits_without_label", "Rs " + "1" * size
@@ -0,0 +1,70 @@
+"""
+Parse statement PDFs in bulk and print one JSON record per line
+Usage: python -m parsers <dir | file | glob> ... [--workers N] [--output results.ndjson]
+                         [--store statements.db]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from parsers.batch import default_workers, parse_many
+from parsers.store import StatementStore, file_hash
+
+
+def collect_paths(targets):
+    """PDF paths named by directories, files and glob patterns, in a stable order"""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            matches = glob.glob(os.path.join(target, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(target, "**", "*.PDF"), recursive=True)
+        elif os.path.isfile(target):
+            matches = [target]
+        else:
+            matches = glob.glob(target, recursive=True)
+        paths.extend(sorted(set(matches)))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m parsers", description="Parse credit card statement PDFs in bulk")
+    parser.add_argument("targets", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="worker processes (default: CPU count)")
+    parser.add_argument("--output", help="write NDJSON here instead of stdout")
+    parser.add_argument("--store", help="also keep the results in this SQLite statement store")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.targets)
+    if not paths:
+        print("No PDF files found", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    writer = StatementStore(args.store).bulk() if args.store else None
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for record in parse_many(paths, workers=args.workers):
+            failed += "error" in record
+            if writer is not None and "result" in record:
+                writer.add(file_hash(record["source"]), record["result"], record["source"])
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if writer is not None:
+            writer.flush()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"📄 {len(paths)} files, {failed} failed, {elapsed:.2f}s "
+          f"({len(paths) / elapsed:.1f} docs/sec, {args.workers} workers)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Text-extraction backends.
+
+A Document reads each page's text through one backend, chosen by name
+from BACKENDS. Every backend has the same interface: it is built on the
+Document, page_text(index) returns the text of one page, and close()
+releases whatever it opened. Page counts, the prescan and the pdfminer
+fallback stay with the Document, whichever backend reads the text.
+
+    pymupdf          page.get_text() with default flags, as always used
+    pymupdf_tuned    one TextPage per page made with TUNED_FLAGS only
+    pymupdf_blocks   text blocks from page.get_text("blocks"), joined
+    pdfminer         pdfminer.six with TUNED_LAPARAMS, pages in order
+    pypdf            pypdf's extract_text(), if pypdf is installed
+    pypdfium2        PDFium's text page, if pypdfium2 is installed
+
+TEXT_BACKEND picks the default. python -m benchmarks.calibrate_backends
+runs every available backend over a corpus and reports speed and field
+accuracy, to choose it by.
+"""
+
+import functools
+import io
+import os
+
+DEFAULT_BACKEND = os.environ.get("TEXT_BACKEND", "pymupdf")
+
+# Keep text inside the page and nothing else: no ligature, whitespace or
+# image bookkeeping that the field patterns never look at
+TUNED_FLAGS = 64  # fitz.TEXT_MEDIABOX_CLIP
+# pdfminer layout analysis without the box ordering pass (boxes_flow=None),
+# which costs the most and changes nothing for label-value statements
+TUNED_LAPARAMS = {"line_margin": 0.5, "char_margin": 2.0, "word_margin": 0.1, "boxes_flow": None}
+
+
+class BackendError(Exception):
+    """Raised for an unknown backend or one whose library is not installed"""
+
+
+class BufferStream(io.RawIOBase):
+    """
+    Read-only binary stream over bytes or a memoryview, read in place.
+    io.BytesIO would copy a memoryview, e.g. of an mmap-backed upload.
+    """
+
+    def __init__(self, data):
+        super().__init__()
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = max(min(len(buffer), len(self._view) - self._position), 0)
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+class TextBackend:
+    """Per-page text of one Document; subclasses set name and module and implement page_text()"""
+
+    name = None
+    # Module that has to be installed for the backend to be available
+    module = None
+
+    def __init__(self, document):
+        self.document = document
+
+    @classmethod
+    def available(cls):
+        # Looked up without importing it, so checking costs nothing at startup
+        from importlib.util import find_spec
+        return cls.module is None or find_spec(cls.module) is not None
+
+    def page_text(self, index):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _stream(self):
+        """Binary stream over the Document's PDF, for libraries that read one"""
+        if self.document.data is None:
+            return open(self.document.pdf_path, "rb")
+        return BufferStream(self.document.data)
+
+
+class PyMuPDFBackend(TextBackend):
+    """PyMuPDF with its default text flags, on the Document's own handle"""
+
+    name = "pymupdf"
+    module = "fitz"
+
+    def page_text(self, index):
+        return self.document._handle()[index].get_text()
+
+
+class TunedPyMuPDFBackend(TextBackend):
+    name = "pymupdf_tuned"
+    module = "fitz"
+
+    def page_text(self, index):
+        page = self.document._handle()[index]
+        # The TextPage is built once with the tuned flags and extracted from directly
+        return page.get_textpage(flags=TUNED_FLAGS).extractText()
+
+
+class BlocksPyMuPDFBackend(TextBackend):
+    name = "pymupdf_blocks"
+    module = "fitz"
+
+    def page_text(self, index):
+        blocks = self.document._handle()[index].get_text("blocks", flags=TUNED_FLAGS)
+        # (x0, y0, x1, y1, text, block number, block type); type 1 is an image
+        return "".join(block[4] if block[4].endswith("\n") else block[4] + "\n"
+                       for block in blocks if block[6] == 0)
+
+
+class PdfminerBackend(TextBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def __init__(self, document):
+        super().__init__(document)
+        self._pages = None
+        self._next = 0
+
+    def page_text(self, index):
+        # Pages come from one pass over the file, started at the first page
+        # asked for, so a chunk from the middle of the document costs its
+        # own pages only. Any other page starts a new pass there.
+        if self._pages is None or index != self._next:
+            from pdfminer.layout import LAParams
+            self.close()
+            self._pages = self.document._pdfminer_pages(laparams=LAParams(**TUNED_LAPARAMS), first=index)
+            self._next = index
+        self._next += 1
+        return next(self._pages, "")
+
+    def close(self):
+        if self._pages is not None:
+            self._pages.close()
+            self._pages = None
+
+
+class PypdfBackend(TextBackend):
+    name = "pypdf"
+    module = "pypdf"
+
+    def __init__(self, document):
+        super().__init__(document)
+        self._reader = None
+
+    def page_text(self, index):
+        if self._reader is None:
+            from pypdf import PdfReader
+            self._reader = PdfReader(self._stream())
+        return self._reader.pages[index].extract_text() + "\n"
+
+    def close(self):
+        self._reader = None
+
+
+class Pdfium2Backend(TextBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def __init__(self, document):
+        super().__init__(document)
+        self._pdf = None
+
+    def page_text(self, index):
+        if self._pdf is None:
+            import pypdfium2
+            data = self.document.data
+            if data is None:
+                source = self.document.pdf_path
+            elif isinstance(data, bytes):
+                source = data
+            else:
+                # PDFium takes bytes or a stream; a stream reads the buffer in place
+                source = self._stream()
+            self._pdf = pypdfium2.PdfDocument(source, autoclose=True)
+        page = self._pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range() + "\n"
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+BACKENDS = {backend.name: backend for backend in (
+    PyMuPDFBackend, TunedPyMuPDFBackend, BlocksPyMuPDFBackend, PdfminerBackend, PypdfBackend, Pdfium2Backend,
+)}
+
+
+def available_backends():
+    """Names of the backends whose libraries are installed"""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend(name=None):
+    """The backend class for a name (DEFAULT_BACKEND if None), or BackendError"""
+    name = name or DEFAULT_BACKEND
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise BackendError(f"Unknown text backend '{name}', choose from {', '.join(BACKENDS)}")
+    if not backend.available():
+        raise BackendError(f"Text backend '{name}' needs {backend.module}, which is not installed")
+    return backend
@@ -1,282 +1,235 @@
-import re
-from parsers.base_parser import BaseParser
+import time
+
+from parsers import telemetry
+from parsers.base_parser import BaseParser, bank_field
+from parsers.document import BudgetExceeded, Document, UnparseablePDF
+from parsers.extraction import (
+    extract_fields_lazy, detect_bank, identify_bank, compile_all,
+    FIELDS, NOT_FOUND, NO_AMOUNT, TIMED_OUT,
+    CARDHOLDER, CARD_NUMBER, BILLING_CYCLE, TOTAL_DUE, DUE_DATE,
+)
 
 class HDFCParser(BaseParser):
     """Parser for HDFC Bank credit card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "HDFC Bank",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Cardholder)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*Period|Billing\s*Cycle|Statement\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|Payment\s*Due)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "HDFC Bank"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Cardholder)[:\s]+([^\r\n]+)", ("name", "cardholder")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*Period|Billing\s*Cycle|Statement\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|Payment\s*Due)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "payment")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class ICICIParser(BaseParser):
     """Parser for ICICI Bank credit card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "ICICI Bank",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Customer\s*Name)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*Period|Bill\s*Period)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|Minimum\s*Amount\s*Due)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|on)|Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "ICICI Bank"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Customer\s*Name)[:\s]+([^\r\n]+)", ("name", "customer")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*Period|Bill\s*Period)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "bill")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|Minimum\s*Amount\s*Due)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "minimum")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|on)|Due\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class SBIParser(BaseParser):
     """Parser for SBI Card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "SBI Card",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Card\s*Member)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*Period|Billing\s*Period)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|Outstanding)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*(?:Date|on))[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "SBI Card"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Card\s*Member)[:\s]+([^\r\n]+)", ("name", "card")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*Period|Billing\s*Period)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|Outstanding)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "outstanding")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*(?:Date|on))[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class AxisParser(BaseParser):
     """Parser for Axis Bank credit card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "Axis Bank",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Primary\s*Card\s*Member)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*(?:Period|Date)|Billing\s*Cycle)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|Amount\s*Payable)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "Axis Bank"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Primary\s*Card\s*Member)[:\s]+([^\r\n]+)", ("name", "primary")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*(?:Period|Date)|Billing\s*Cycle)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|Amount\s*Payable)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "amount")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class AmexParser(BaseParser):
     """Parser for American Express credit card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "American Express",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Card\s*Member)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4,5})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*(?:Period|Closing\s*Date)|Billing\s*Period)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|New\s*Balance|Payment\s*Due)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "American Express"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Card\s*Member)[:\s]+([^\r\n]+)", ("name", "card")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4,5})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*(?:Period|Closing\s*Date)|Billing\s*Period)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|New\s*Balance|Payment\s*Due)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "new", "payment")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class PNBParser(BaseParser):
     """Parser for Punjab National Bank credit card statements"""
     
-    def parse(self):
-        data = {
-            "Bank": "Punjab National Bank",
-            "Cardholder": self.extract_with_regex(r"(?:Name|Card\s*Holder|Customer\s*Name)[:\s]+([^\r\n]+)"),
-            "Card Last 4 Digits": self.extract_with_regex(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})"),
-            "Billing Cycle": self.extract_with_regex(r"(?:Statement\s*(?:Period|Date)|Billing\s*(?:Period|Cycle))[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
-            "Total Due": self.extract_amount(r"(?:Total\s*(?:Amount\s*)?Due|Outstanding|Amount\s*Payable)[:\s]*(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)"),
-            "Payment Due Date": self.extract_date(r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})")
-        }
-        return data
+    bank = "Punjab National Bank"
+    fields = (
+        bank_field(CARDHOLDER, r"(?:Name|Card\s*Holder|Customer\s*Name)[:\s]+([^\r\n]+)", ("name", "card", "customer")),
+        bank_field(CARD_NUMBER, r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+        bank_field(BILLING_CYCLE, r"(?:Statement\s*(?:Period|Date)|Billing\s*(?:Period|Cycle))[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+        bank_field(TOTAL_DUE, r"(?:Total\s*(?:Amount\s*)?Due|Outstanding|Amount\s*Payable)[:\s]*+(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "outstanding", "amount")),
+        bank_field(DUE_DATE, r"(?:Payment\s*Due\s*(?:Date|By)|Due\s*Date)[:\s]*+(\d{1,2}[/-]\w{3}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("payment", "due")),
+    )
 
 class GenericParser(BaseParser):
     """Generic parser for any credit card statement"""
     
     def parse(self):
-        # Try to detect bank name from the PDF
-        bank_name = self.detect_bank_name()
-        
-        data = {
-            "Bank": bank_name,
-            "Cardholder": self.extract_cardholder(),
-            "Card Last 4 Digits": self.extract_card_number(),
-            "Billing Cycle": self.extract_billing_cycle(),
-            "Total Due": self.extract_total_due(),
-            "Payment Due Date": self.extract_due_date()
-        }
+        # All fields come from the precompiled cascades in parsers.extraction,
+        # reading only as many pages as it takes to pin them down
+        start, read_before = time.perf_counter(), self.document.extract_seconds
+        data = extract_fields_lazy(self.document, self.tiers)
+        # Page reads are timed by the Document; the rest is regex work
+        read = self.document.extract_seconds - read_before
+        telemetry.observe("cascade", time.perf_counter() - start - read)
+        self.document.close()
+        data["_meta"] = self.metadata()
+        data["_meta"]["tiers"] = self.tiers
+        return data
+    
+    def search_text(self):
+        """Text wrapped for the extraction engine, shared through the Document"""
+        return self.document.search_text()
+    
+    def fill_missing(self, data, skip=()):
+        """Fill the fields another parser could not find, except those in skip, from the generic cascades"""
+        for field in FIELDS:
+            if data.get(field.name) in (NOT_FOUND, NO_AMOUNT, None) and field.name not in skip:
+                data[field.name] = self._extract(field, "fill_missing")
         return data
     
+    def _extract(self, field, stage):
+        with telemetry.span(stage):
+            value, tier = field.extract(self.search_text())
+        telemetry.count_tier(field, tier)
+        self.tiers[field.name] = telemetry.tier_label(field, tier)
+        return value
+    
     def detect_bank_name(self):
         """Try to detect bank name from common patterns"""
-        # Extended bank patterns
-        bank_patterns = [
-            (r'(HDFC\s*Bank)', 'HDFC Bank'),
-            (r'(ICICI\s*Bank)', 'ICICI Bank'),
-            (r'(SBI\s*Card)', 'SBI Card'),
-            (r'(State\s*Bank)', 'State Bank of India'),
-            (r'(Axis\s*Bank)', 'Axis Bank'),
-            (r'(American\s*Express|AMEX)', 'American Express'),
-            (r'(Punjab\s*National\s*Bank|PNB)', 'Punjab National Bank'),
-            (r'(Kotak\s*Mahindra)', 'Kotak Mahindra Bank'),
-            (r'(Yes\s*Bank)', 'Yes Bank'),
-            (r'(IndusInd\s*Bank)', 'IndusInd Bank'),
-            (r'(Citibank|Citi)', 'Citibank'),
-            (r'(Standard\s*Chartered)', 'Standard Chartered'),
-            (r'(HSBC)', 'HSBC'),
-            (r'(RBL\s*Bank)', 'RBL Bank'),
-            (r'(Bank\s*of\s*Baroda|BOB)', 'Bank of Baroda'),
-            (r'(Canara\s*Bank)', 'Canara Bank'),
-            (r'(Union\s*Bank)', 'Union Bank of India'),
-            (r'(IDFC\s*First)', 'IDFC FIRST Bank'),
-        ]
-        
-        text_upper = self.text.upper()
-        
-        for pattern, bank_name in bank_patterns:
-            if re.search(pattern, text_upper, re.IGNORECASE):
-                return bank_name
-        
-        return "Unknown Bank"
+        return detect_bank(self.search_text())
     
     def extract_cardholder(self):
         """Try multiple patterns to find cardholder name"""
-        patterns = [
-            # Label and value on the same line
-            r"(?:Name|Card\s*Holder|Customer\s*Name|Primary\s*Card\s*Member|Card\s*Member)[:\s]+([^\r\n]+)",
-            # Label on one line and value on next line
-            r"(?:Name|Card\s*Holder|Customer\s*Name|Primary\s*Card\s*Member|Card\s*Member)\s*[:]*\s*\r?\n\s*([^\r\n]+)",
-            # Greetings line
-            r"(?:Dear|Mr\.?|Mrs\.?|Ms\.?)\s+([^\r\n]+)",
-            # Fallback two-or-three word capitalized name
-            r"([A-Z][a-zA-Z]+\s+[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)"
-        ]
-        
-        for pattern in patterns:
-            result = self.extract_with_regex(pattern)
-            if result != "Not Found" and len(result) > 3:
-                return result
-        
-        return "Not Found"
+        return self._extract(CARDHOLDER, "extract_cardholder")
     
     def extract_card_number(self):
         """Try multiple patterns to find card last 4 digits"""
-        patterns = [
-            r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*[xX*\s\-]*?(\d{4})",
-            r"[xX*]{4,12}[\s\-]?(\d{4})",
-            r"(?:Card|A\/C)[:\s]*[xX*\s\-]*?(\d{4})"
-        ]
-        
-        for pattern in patterns:
-            result = self.extract_with_regex(pattern)
-            if result != "Not Found" and result.isdigit() and len(result) == 4:
-                return result
-        
-        return "Not Found"
+        return self._extract(CARD_NUMBER, "extract_card_number")
     
     def extract_billing_cycle(self):
         """Try multiple patterns to find billing cycle"""
-        patterns = [
-            r"(?:Statement\s*(?:Period|Date)|Billing\s*(?:Period|Cycle|From))[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3,9}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3,9}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})",
-            r"(?:From|Period)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"(\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"
-        ]
-        
-        for pattern in patterns:
-            result = self.extract_with_regex(pattern)
-            if result != "Not Found":
-                return result
-        
-        return "Not Found"
+        return self._extract(BILLING_CYCLE, "extract_billing_cycle")
     
     def extract_total_due(self):
         """Try multiple patterns to find total due amount"""
-        patterns = [
-            # Core labels excluding date contexts (Payment Due Date / Due Date)
-            r"(?:Total\s*(?:Amount\s*)?Due|Amount\s*Payable|Outstanding|New\s*Balance|Payment\s*Due(?!\s*Date))[^\d\r\n]{0,20}(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)",
-            # 'Total' followed by amount (avoid generic 'Due' to prevent 'Due Date' collisions)
-            r"Total[^\d\r\n]{0,20}(?:\n\s*)?(?:Rs\.?|INR|₹)?\s*([\d,]+\.?\d*)",
-            # Currency first patterns
-            r"(?:Rs\.?|INR|₹)\s*([\d,]+\.?\d*)\s*(?:Due|Payable)"
-        ]
-        
-        for pattern in patterns:
-            result = self.extract_amount(pattern)
-            if result != "₹0.00":
-                return result
-        
-        # Fallback: scan lines near 'Total Due' and pick the first valid amount on the same or next two lines
-        try:
-            lines = self.text.splitlines()
-            for i, line in enumerate(lines):
-                if re.search(r"total\s*(amount\s*)?due", line, re.IGNORECASE):
-                    neighborhood = "\n".join(lines[i:i+3])
-                    m = re.search(r"([\d]{1,3}(?:[, ]\d{2,3})+(?:\.\d{1,2})?|\d+\.\d{1,2}|\d{4,})", neighborhood)
-                    if m:
-                        amt = re.sub(r"\s+", "", m.group(1))
-                        if not amt.startswith('₹'):
-                            amt = '₹' + amt
-                        return amt
-        except Exception:
-            pass
-        
-        return "₹0.00"
+        return self._extract(TOTAL_DUE, "extract_total_due")
     
     def extract_due_date(self):
         """Try multiple patterns to find payment due date"""
-        patterns = [
-            r"(?:Payment\s*Due\s*(?:Date|By|On)|Due\s*(?:Date|By|On)|Pay\s*By)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\w{3,9}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})",
-            r"(?:Due\s*Date)[:\s]*(?:\n\s*)?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",
-            r"(?:Pay\s*By|Due)[:\s]*(?:\n\s*)?(\d{1,2}\s+\w{3,9}\s+\d{4})"
-        ]
-        
-        for pattern in patterns:
-            result = self.extract_date(pattern)
-            if result != "Not Found":
-                return result
-        
-        return "Not Found"
+        return self._extract(DUE_DATE, "extract_due_date")
+
 
+# Parser for each bank name reported by parsers.extraction.identify_bank
+BANK_PARSERS = {
+    "HDFC Bank": HDFCParser,
+    "ICICI Bank": ICICIParser,
+    "SBI Card": SBIParser,
+    "State Bank of India": SBIParser,
+    "Axis Bank": AxisParser,
+    "American Express": AmexParser,
+    "Punjab National Bank": PNBParser,
+}
 
-def detect_bank_and_parse(pdf_path):
+# Share of the bank mentions on the first page the leading bank needs
+# before its own parser is trusted
+MIN_BANK_CONFIDENCE = 0.6
+
+
+def detect_bank_and_parse(source):
     """
-    Detect which bank issued the statement and parse accordingly
+    Detect which bank issued the statement and parse accordingly.
+    source is a file path, the PDF as bytes, a memoryview or a binary
+    stream, or a Document that other parsers may already have read.
+    
+    The bank is identified from the first page alone. A recognised bank goes
+    to its own parser, and any field that parser misses is filled in by the
+    generic cascades; otherwise GenericParser handles the whole statement.
+    Either way pages are read only until every field is settled, and every
+    parser works on the same Document, so the PDF is read only once.
+    
+    Fields whose cascade stopped at its deadline are listed in
+    _meta.timed_out; such a result is degraded and should not be cached.
+    Raises UnparseablePDF for files rejected by Document.prescan() or with
+    no text at all, and BudgetExceeded, carrying the fields parsed from the
+    pages read, when reading stopped at the document's page, time or text budget.
     """
-    # UNIVERSAL MODE: always use GenericParser for broader compatibility
-    # Note: keeping the bank-specific detection and dispatch below for reference.
-    return GenericParser(pdf_path).parse()
+    document = source if isinstance(source, Document) else Document(source)
+    document.prescan()
+    first_page, _ = document.prefix(1)
+    if not first_page.strip() and not document.text.strip():
+        raise UnparseablePDF("no_text", "No text could be extracted. The PDF may be scanned or image-based")
+    with telemetry.span("bank_detect"):
+        bank_name, confidence = identify_bank(first_page)
+    parser_class = BANK_PARSERS.get(bank_name)
+    
+    # Fields whose cascade gave up at its deadline
+    timed_out = set()
+    if parser_class is None or confidence < MIN_BANK_CONFIDENCE:
+        telemetry.PARSERS_USED.inc("GenericParser")
+        data = GenericParser(document).parse()
+        data["_meta"]["parser"] = "GenericParser"
+    else:
+        telemetry.PARSERS_USED.inc(parser_class.__name__)
+        parser = parser_class(document, bank_name)
+        data = parser.parse()
+        timed_out.update(name for name, tier in parser.tiers.items() if tier == TIMED_OUT)
+        generic = GenericParser(document)
+        # The result is degraded either way; a second deadline on the same
+        # text would only double the time spent on it
+        generic.fill_missing(data, skip=timed_out)
+        document.close()
+        data["_meta"] = document.stats()
+        data["_meta"]["parser"] = parser_class.__name__
+        data["_meta"]["bank_confidence"] = round(confidence, 2)
+        data["_meta"]["tiers"] = {field.name: generic.tiers.get(field.name, parser.tiers[field.name]) for field in FIELDS}
+    
+    timed_out.update(name for name, tier in data["_meta"]["tiers"].items() if tier == TIMED_OUT)
+    if timed_out:
+        data["_meta"]["timed_out"] = [field.name for field in FIELDS if field.name in timed_out]
+    
+    if document.truncated:
+        raise BudgetExceeded(
+            document.truncated,
+            f"Stopped reading after {len(document.pages)} pages ({document.truncated.replace('_', ' ')})",
+            data,
+        )
+    return data
 
-    # --- Previous bank-specific flow (kept for reference) ---
-    # parser = BaseParser(pdf_path)
-    # text = parser.text.lower()
-    # bank_patterns = {
-    #     'hdfc': ['hdfc', 'hdfc bank'],
-    #     'icici': ['icici', 'icici bank'],
-    #     'sbi': ['sbi card', 'state bank'],
-    #     'axis': ['axis bank', 'axis'],
-    #     'amex': ['american express', 'amex']
-    # }
-    # detected_bank = None
-    # for bank, patterns in bank_patterns.items():
-    #     for pattern in patterns:
-    #         if pattern in text:
-    #             detected_bank = bank
-    #             break
-    #     if detected_bank:
-    #         break
-    # if detected_bank == 'hdfc':
-    #     return HDFCParser(pdf_path).parse()
-    # elif detected_bank == 'icici':
-    #     return ICICIParser(pdf_path).parse()
-    # elif detected_bank == 'sbi':
-    #     return SBIParser(pdf_path).parse()
-    # elif detected_bank == 'axis':
-    #     return AxisParser(pdf_path).parse()
-    # elif detected_bank == 'amex':
-    #     return AmexParser(pdf_path).parse()
-    # else:
-    #     parsers = [HDFCParser(pdf_path), ICICIParser(pdf_path), SBIParser(pdf_path), AxisParser(pdf_path), AmexParser(pdf_path)]
-    #     best_result = None
-    #     best_score = 0
-    #     for parser in parsers:
-    #         result = parser.parse()
-    #         score = sum(1 for v in result.values() if v != "Not Found" and v != "₹0.00")
-    #         if score > best_score:
-    #             best_score = score
-    #             best_result = result
-    #     return best_result if best_score > 2 else None
\ No newline at end of file
+
+def warm_up():
+    """
+    Do the one-off work of a first parse ahead of time: import PyMuPDF,
+    compile every pattern and parse a one-page statement built in memory.
+    Meant for platforms that can call a hook when an instance starts.
+    Returns the seconds it took.
+    """
+    start = time.perf_counter()
+    import fitz
+    compile_all()
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "HDFC Bank\nCardholder: Warm Up\nTotal Due: Rs. 1.00", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    detect_bank_and_parse(data)
+    return time.perf_counter() - start
@@ -1,59 +1,92 @@
-import fitz  # PyMuPDF
-from pdfminer.high_level import extract_text
-import re
+import time
+from parsers import telemetry
+from parsers.document import Document
+from parsers.extraction import NO_AMOUNT, NOT_FOUND, Field, Tier, _clean_amount, _clean_text, extract_fields_lazy
+from parsers.transactions import extract_transactions
+
+
+def bank_field(field, pattern, anchors):
+    """
+    A bank parser's cascade for one of the parsers.extraction fields: the
+    single pattern, whose match has to start with one of the anchors (lower
+    case), and any value it finds is kept. Its values are reported with the
+    tier label bank_parser.
+    """
+    return Field(field.name, [Tier(pattern, anchors)], accept=lambda value: True,
+                 default=field.default, clean=field.clean, label="bank_parser")
+
 
 class BaseParser:
     """Base class for all bank-specific parsers"""
     
-    def __init__(self, pdf_path):
-        self.pdf_path = pdf_path
-        self.text = self.extract_text()
+    # Bank name reported by parse(), and its bank_field() cascades
+    bank = None
+    fields = ()
+    
+    def __init__(self, source, bank_name=None):
+        """
+        source is a PDF file path, the PDF itself as bytes or a binary stream,
+        or a Document already opened by another parser. bank_name is the bank
+        detection matched, reported in place of the class's bank.
+        """
+        # Pages are only read from the PDF once something asks for them
+        self.document = source if isinstance(source, Document) else Document(source)
+        self.pdf_path = self.document.pdf_path
+        self.bank_name = bank_name or self.bank
+        # Field name -> label of the cascade tier that produced its value
+        self.tiers = {}
+    
+    @property
+    def text(self):
+        """Text of the whole statement"""
+        return self.document.text
     
     def extract_text(self):
-        """Extract text from PDF using PyMuPDF (faster)"""
-        try:
-            doc = fitz.open(self.pdf_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
-        except Exception as e:
-            print(f"PyMuPDF failed, trying pdfminer: {e}")
-            # Fallback to pdfminer
-            try:
-                return extract_text(self.pdf_path)
-            except Exception as e2:
-                print(f"pdfminer also failed: {e2}")
-                return ""
-    
-    def extract_with_regex(self, pattern, default="Not Found"):
+        """Extract text from PDF with the document's text backend, falling back to pdfminer"""
+        with telemetry.span("extract_text"):
+            return self.document.text
+    
+    def extract_transactions(self):
+        """Transaction rows of the statement, as parsers.transactions.Transactions columns"""
+        return extract_transactions(self.document)
+    
+    def metadata(self):
+        """Extraction details reported next to the parsed fields"""
+        return self.document.stats()
+    
+    def extract_with_regex(self, pattern, default=NOT_FOUND, anchors=()):
         """Extract data using regex pattern"""
-        match = re.search(pattern, self.text, re.IGNORECASE | re.MULTILINE)
-        if match:
-            return match.group(1).strip()
-        return default
+        return self._search("extract_with_regex", pattern, anchors, default, _clean_text)
     
-    def extract_amount(self, pattern, default="₹0.00"):
+    def extract_amount(self, pattern, default=NO_AMOUNT, anchors=()):
         """Extract amount and format it"""
-        match = re.search(pattern, self.text, re.IGNORECASE | re.MULTILINE)
-        if match:
-            amount = match.group(1).strip()
-            # Clean up amount (remove extra spaces, commas)
-            amount = re.sub(r'\s+', '', amount)
-            # Ensure it has rupee symbol
-            if not amount.startswith('₹'):
-                amount = '₹' + amount
-            return amount
-        return default
-    
-    def extract_date(self, pattern, default="Not Found"):
+        return self._search("extract_amount", pattern, anchors, default, _clean_amount)
+    
+    def extract_date(self, pattern, default=NOT_FOUND, anchors=()):
         """Extract date from text"""
-        match = re.search(pattern, self.text, re.IGNORECASE | re.MULTILINE)
-        if match:
-            return match.group(1).strip()
-        return default
+        return self._search("extract_date", pattern, anchors, default, _clean_text)
+    
+    def _search(self, name, pattern, anchors, default, clean):
+        """
+        Group 1 of pattern's first match in the whole statement, cleaned, or
+        default. It runs as a parsers.extraction cascade: given anchors, the
+        lower-case keywords a match starts with, only their offsets are tried,
+        each with a MATCH_WINDOW window, and at FIELD_DEADLINE it gives up
+        with default, counted and logged as a regex_deadline like any field.
+        """
+        field = Field(name, [Tier(pattern, anchors)], accept=lambda value: True, default=default, clean=clean)
+        return field.extract(self.document.search_text())[0]
     
     def parse(self):
-        """Override this method in child classes"""
-        raise NotImplementedError("Each parser must implement parse()")
+        """
+        The bank and the fields, each found by its cascade in fields on as
+        few pages as it takes to settle it; override it for other fields
+        """
+        if not self.fields:
+            raise NotImplementedError("Each parser must list its fields or implement parse()")
+        start, read_before = time.perf_counter(), self.document.extract_seconds
+        data = extract_fields_lazy(self.document, self.tiers, self.fields, self.bank_name)
+        # Page reads are timed by the Document; the rest is regex work
+        read = self.document.extract_seconds - read_before
+        telemetry.observe("bank_parser", time.perf_counter() - start - read)
+        return data
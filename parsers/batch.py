@@ -0,0 +1,102 @@
+"""
+Parse many statements at once across a pool of worker processes.
+
+Text extraction and the regex cascades are CPU-bound and hold the GIL, so
+parse_many() fans the work out to processes rather than threads. Results
+come back in completion order, one record per input, and a failure in one
+file is reported in its record instead of stopping the batch.
+"""
+
+import os
+
+from parsers import telemetry
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import UnparseablePDF
+from parsers.parallel import process_context
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _label(index, source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return f"#{index}"
+
+
+def _parse_one(index, name, source):
+    """Parse one input and wrap the outcome in a record"""
+    try:
+        result = detect_bank_and_parse(source)
+        if result is None:
+            return {"index": index, "source": name, "error": "Could not parse the statement"}
+        return {"index": index, "source": name, "result": result}
+    except UnparseablePDF as e:
+        return {"index": index, "source": name, **e.to_dict()}
+    except Exception as e:
+        return {"index": index, "source": name, "error": f"{type(e).__name__}: {e}"}
+
+
+def _items(sources):
+    """(index, name, source) for each input; (name, source) pairs keep their name"""
+    for index, source in enumerate(sources):
+        if isinstance(source, tuple):
+            name, source = source
+        else:
+            name = _label(index, source)
+        yield index, name, source
+
+
+def parse_many(sources, workers=None):
+    """
+    Parse every source and yield one record per input as it completes.
+
+    sources is an iterable of paths, PDF bytes or (name, path or bytes) pairs. A
+    record has index, source and either result or error. At most a few
+    inputs per worker are in flight at a time, so long or lazy iterables
+    do not have to fit in memory.
+    """
+    workers = workers or default_workers()
+    items = _items(sources)
+    # Importing the process pool pulls in multiprocessing; only pay for it here
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    if workers <= 1:
+        for item in items:
+            yield _parse_one(*item)
+        return
+
+    try:
+        # Never forked: the API calls this from a threaded server
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+    except (OSError, NotImplementedError) as e:
+        # Some serverless sandboxes have no working multiprocessing
+        telemetry.log("process_pool_unavailable", level="warning", error=str(e))
+        for item in items:
+            yield _parse_one(*item)
+        return
+
+    with pool:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < workers * 4:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    try:
+                        pending[pool.submit(_parse_one, *item)] = item
+                    except Exception as e:
+                        yield {"index": item[0], "source": item[1], "error": f"{type(e).__name__}: {e}"}
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, name, _ = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # e.g. the worker process crashed; report it against this file
+                    yield {"index": index, "source": name, "error": f"{type(e).__name__}: {e}"}
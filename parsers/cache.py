@@ -0,0 +1,151 @@
+"""
+Cache of parse results keyed by the uploaded PDF's content.
+
+Keys combine a SHA-256 of the file bytes with PARSER_VERSION, a hash of the
+parser sources, so editing any pattern in the parsers package makes every
+earlier entry unreachable. Entries live in an in-process LRU and, when a
+database path is given, in a SQLite file that survives restarts and is
+shared by every worker process pointing at it.
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _parser_version():
+    """Hash of every module in the parsers package"""
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(package_dir, "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode())
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+PARSER_VERSION = _parser_version()
+
+
+def content_hasher():
+    """Running hash whose hexdigest() is the content_key() of the bytes fed to update()"""
+    return hashlib.sha256(PARSER_VERSION.encode())
+
+
+def content_key(data):
+    """Cache key for the bytes of an uploaded PDF"""
+    digest = content_hasher()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU of parse results with a TTL and an optional SQLite tier"""
+
+    def __init__(self, max_entries=256, ttl=24 * 3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if db_path:
+            self._db().execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, created REAL NOT NULL, result TEXT NOT NULL)"
+            )
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, result = entry
+                if now - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(result)
+                del self._entries[key]
+                self.evictions += 1
+
+        if self.db_path:
+            row = self._db().execute(
+                "SELECT created, result FROM results WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                created, result = row[0], json.loads(row[1])
+                self._remember(key, created, result)
+                with self._lock:
+                    self.disk_hits += 1
+                return copy.deepcopy(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store a parse result under key"""
+        created = time.time()
+        result = copy.deepcopy(result)
+        self._remember(key, created, result)
+        if self.db_path:
+            db = self._db()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO results (key, created, result) VALUES (?, ?, ?)",
+                    (key, created, json.dumps(result, ensure_ascii=False)),
+                )
+                db.execute("DELETE FROM results WHERE created <= ?", (created - self.ttl,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM results")
+
+    def stats(self):
+        """Hit, miss and eviction counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk": bool(self.db_path),
+                "parser_version": PARSER_VERSION,
+            }
+
+    def _remember(self, key, created, result):
+        with self._lock:
+            self._entries[key] = (created, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _db(self):
+        """SQLite connection for the calling thread"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3  # only needed with a database path
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
@@ -0,0 +1,414 @@
+import bisect
+import io
+import itertools
+import os
+import time
+
+from parsers import telemetry
+from parsers.backends import BufferStream, get_backend
+from parsers.extraction import SearchText
+from parsers.parallel import MIN_CHUNK_PAGES, PARALLEL_WORKERS, ParallelReader, pool, use_parallel
+
+# Files with more pages than this are rejected before any text is read
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 2000))
+# Reading stops after this many pages or seconds, and the statement is
+# parsed from what was read so far
+PAGE_BUDGET = int(os.environ.get("PDF_PAGE_BUDGET", 500))
+TIME_BUDGET = float(os.environ.get("PDF_TIME_BUDGET", 20))
+# ...or after this many characters of text, which bounds the memory a
+# single statement's text and its search views can take
+TEXT_BUDGET = int(os.environ.get("PDF_TEXT_BUDGET", 8_000_000))
+# Pages looked at by prescan() for the image-only check
+PRESCAN_PAGES = 3
+
+
+class UnparseablePDF(Exception):
+    """Raised when a PDF is rejected; reason is a short machine-readable code"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+    def to_dict(self):
+        return {"error": str(self), "reason": self.reason}
+
+
+class BudgetExceeded(UnparseablePDF):
+    """Raised when reading stopped at a budget; partial holds what was parsed"""
+
+    def __init__(self, reason, message, partial):
+        super().__init__(reason, message)
+        self.partial = partial
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["partial"] = self.partial
+        return data
+
+
+def pdf_bytes(source):
+    """The PDF in source as bytes or a memoryview, or None if source is a filesystem path"""
+    if isinstance(source, (str, os.PathLike)):
+        return None
+    if isinstance(source, (bytes, bytearray)):
+        return source
+    if isinstance(source, memoryview):
+        if isinstance(source.obj, (bytes, bytearray)) and source.nbytes == len(source.obj):
+            return source.obj
+        # e.g. a view of an mmap, which PyMuPDF 1.25.4 and later reads in place
+        return source.cast("B") if source.c_contiguous else source.tobytes()
+    if hasattr(source, "read"):
+        return source.read()
+    raise TypeError(f"Cannot read a PDF from {type(source).__name__}")
+
+
+class Document:
+    """
+    Text of a PDF, read one page at a time as it is needed.
+
+    A Document is meant to be shared: any number of parsers can be built
+    on the same instance (BaseParser accepts one in place of a path), and
+    the PDF is opened and decoded once for all of them.
+    """
+
+    def __init__(self, source, page_budget=PAGE_BUDGET, time_budget=TIME_BUDGET, text_budget=TEXT_BUDGET,
+                 backend=None, workers=None):
+        """
+        source is a file path, PDF bytes, a memoryview or a binary file object.
+        Reading stops after page_budget pages, time_budget seconds or
+        text_budget characters; any of them may be None for no limit.
+        backend names the parsers.backends backend that reads the page
+        text, TEXT_BACKEND by default. Long documents are read by workers
+        processes (PDF_PARALLEL_WORKERS by default; 1 reads in place), see
+        parsers.parallel.
+        """
+        self.data = pdf_bytes(source)
+        self.pdf_path = source if self.data is None else None
+        self.page_budget = page_budget
+        self.time_budget = time_budget
+        self.text_budget = text_budget
+        self.text_size = 0
+        self._backend_class = get_backend(backend)
+        self.backend = self._backend_class.name
+        self._reader = None
+        self.workers = workers
+        # ParallelReader once reading starts, False when reading in place
+        self._parallel = None
+        self.pages = []
+        self.page_count = None
+        self.fallback_used = False
+        # Pages PyMuPDF could not read that pdfminer read instead
+        self.fallback_pages = []
+        # "page_budget", "time_budget" or "text_budget" if reading stopped early
+        self.truncated = None
+        self.extract_seconds = 0.0
+        self._started = None
+        self._doc = None
+        self._done = False
+        self._text = None
+        self._offsets = None
+        self._search_text = None
+
+    @classmethod
+    def from_pages(cls, pages, truncated=None):
+        """
+        A Document over page texts that were already read, e.g. one
+        statement of a combined PDF; truncated names the budget that
+        stopped the reading early, if one did
+        """
+        document = cls(b"", page_budget=None, time_budget=None, text_budget=None)
+        document.pages = list(pages)
+        document.page_count = len(document.pages)
+        document.text_size = sum(map(len, document.pages))
+        document.truncated = truncated
+        document._done = True
+        return document
+
+    @property
+    def text(self):
+        """Text of the whole document"""
+        if self._text is None:
+            while self._read_next():
+                pass
+            self._text = "".join(self.pages)
+        return self._text
+
+    def prefix(self, count):
+        """Text of the first count pages, and whether that is the whole document"""
+        while len(self.pages) < count and self._read_next():
+            pass
+        if self._done and count >= len(self.pages):
+            return self.text, True
+        return "".join(self.pages[:count]), False
+
+    @property
+    def lower(self):
+        """Lower-cased view of the whole text, as used by the extraction engine"""
+        search_text = self.search_text()
+        return search_text.view if search_text.view is not None else self.text.lower()
+
+    @property
+    def page_offsets(self):
+        """Offset in text where each page starts"""
+        if self._offsets is None:
+            self.text  # every page has to be read first
+            offsets, position = [], 0
+            for page in self.pages:
+                offsets.append(position)
+                position += len(page)
+            self._offsets = offsets
+        return self._offsets
+
+    def page_at(self, offset):
+        """Zero-based page number holding the given offset in text"""
+        return max(bisect.bisect_right(self.page_offsets, offset) - 1, 0)
+
+    def search_text(self):
+        """parsers.extraction.SearchText of the whole text, built once"""
+        if self._search_text is None:
+            self._search_text = SearchText(self.text)
+        return self._search_text
+
+    def page_words(self):
+        """
+        Yield (page number, words) for every page, words being PyMuPDF
+        (x0, y0, x1, y1, text, block, line, word) tuples. Yields nothing
+        if PyMuPDF cannot open the file, since pdfminer text has no layout.
+        """
+        try:
+            doc = self._open()
+        except Exception as e:
+            telemetry.log("pymupdf_failed", level="warning", error=str(e), stage="page_words")
+            return
+        try:
+            for page in doc:
+                yield page.number, page.get_text("words")
+        finally:
+            doc.close()
+
+    def prescan(self):
+        """
+        Reject files that cannot be parsed before any text is read: raises
+        UnparseablePDF for encrypted files, more than MAX_PAGES pages, or
+        leading pages that carry images but no fonts, i.e. scans. Files
+        PyMuPDF cannot open pass, so the pdfminer fallback can try them.
+        """
+        with telemetry.span("prescan"):
+            try:
+                doc = self._handle()
+            except Exception:
+                return
+            if doc.needs_pass:
+                raise UnparseablePDF("encrypted", "The PDF is password protected")
+            if self.page_count > MAX_PAGES:
+                raise UnparseablePDF("too_many_pages", f"The PDF has {self.page_count} pages, the limit is {MAX_PAGES}")
+            if self.page_count == 0:
+                raise UnparseablePDF("empty", "The PDF has no pages")
+            for index in range(min(PRESCAN_PAGES, self.page_count)):
+                page = doc[index]
+                if page.get_fonts() or not page.get_images():
+                    return
+            raise UnparseablePDF("image_only", "The PDF is scanned or image-based and has no text to parse")
+
+    def stats(self):
+        """How much of the PDF was read and how long it took"""
+        stats = {
+            "pages_read": len(self.pages) if not self.fallback_used else self.page_count,
+            "page_count": self.page_count,
+            "extract_ms": round(self.extract_seconds * 1000, 2),
+            "backend": self.backend if not self.fallback_used else "pdfminer_fallback",
+        }
+        if self.fallback_pages:
+            stats["fallback_pages"] = [index + 1 for index in self.fallback_pages]
+        if self.truncated:
+            stats["truncated"] = self.truncated
+        return stats
+
+    def _over_budget(self):
+        """Name of the budget that is used up, or None"""
+        if self.page_budget is not None and len(self.pages) >= self.page_budget:
+            return "page_budget"
+        if self.text_budget is not None and self.text_size >= self.text_budget:
+            return "text_budget"
+        if self.time_budget is not None and self._started is not None \
+                and time.perf_counter() - self._started > self.time_budget:
+            return "time_budget"
+        return None
+
+    def _read_next(self):
+        """Read one more page, False once there is nothing left"""
+        if self._done:
+            return False
+        if self._started is None:
+            self._started = time.perf_counter()
+        start = time.perf_counter()
+        try:
+            doc = self._handle()
+            if len(self.pages) >= self.page_count:
+                self._finish()
+                return False
+            budget = self._over_budget()
+            if budget:
+                self._stop(budget)
+                return False
+            text = self._next_page_text()
+            self.pages.append(text)
+            self.text_size += len(text)
+            return True
+        except Exception as e:
+            telemetry.log("pymupdf_failed", level="warning", error=str(e))
+            self._fallback()
+            return False
+        finally:
+            self.extract_seconds += time.perf_counter() - start
+
+    def _next_page_text(self):
+        """Text of the next page in order, from the parallel reader if the document has one"""
+        index = len(self.pages)
+        # The first chunk is read in place, so a statement settled on its
+        # first pages never waits on a worker or copies the PDF
+        if self._parallel is None and index >= MIN_CHUNK_PAGES:
+            self._parallel = self._start_parallel(index) or False
+        if self._parallel:
+            try:
+                text = self._parallel.next_page()
+                if text is not None:
+                    return text
+            except Exception as e:
+                # e.g. a worker died; the rest is read in place
+                telemetry.log("parallel_read_failed", level="warning", page=index + 1, error=str(e))
+                self._parallel.close()
+                self._parallel = False
+        return self._page_text(index)
+
+    def _start_parallel(self, index):
+        """A ParallelReader for the pages still to read, or None if they are read in place"""
+        stop = self.page_count if self.page_budget is None else min(self.page_count, self.page_budget)
+        if not use_parallel(stop, self.workers):
+            return None
+        workers = self.workers or PARALLEL_WORKERS
+        executor = pool(workers)
+        if executor is None:
+            return None
+        telemetry.log("parallel_read", pages=stop - index, workers=workers)
+        return ParallelReader(self, index, stop, executor, workers)
+
+    def read_pages(self, start, stop):
+        """
+        Text of pages start to stop - 1, read straight from the PDF without
+        touching the pages read in order; for splitting the reading of one
+        file between processes
+        """
+        self._handle()
+        return [self._page_text(index) for index in range(start, min(stop, self.page_count))]
+
+    def _page_text(self, index):
+        """The backend's text of one page, or pdfminer's if the backend fails on it"""
+        start = time.perf_counter()
+        try:
+            if self._reader is None:
+                self._reader = self._backend_class(self)
+            text = self._reader.page_text(index)
+            telemetry.observe(f"{self.backend}_page", time.perf_counter() - start)
+            return text
+        except Exception as e:
+            telemetry.log(f"{self.backend}_page_failed", level="warning", page=index + 1, error=str(e))
+            self.fallback_pages.append(index)
+            return self._pdfminer_page(index)
+
+    def _pdfminer_pages(self, page_numbers=None, laparams=None, first=0):
+        """
+        Yield the text of each page pdfminer reads (all of them, or
+        page_numbers), from the first-th on; earlier pages are skipped
+        without being laid out
+        """
+        # pdfminer is slow to import and only needed here. This is
+        # pdfminer.high_level.extract_text, handing out one page at a time
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        source = open(self.pdf_path, "rb") if self.data is None else BufferStream(self.data)
+        with source, io.StringIO() as output:
+            manager = PDFResourceManager()
+            device = TextConverter(manager, output, laparams=laparams or LAParams())
+            interpreter = PDFPageInterpreter(manager, device)
+            for page in itertools.islice(PDFPage.get_pages(source, page_numbers), first, None):
+                interpreter.process_page(page)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+
+    def _pdfminer_page(self, index):
+        """pdfminer's text of one page, "" if it fails too"""
+        telemetry.FALLBACKS.inc()
+        try:
+            with telemetry.span("pdfminer_page"):
+                return "".join(self._pdfminer_pages([index]))
+        except Exception as e2:
+            telemetry.log("pdfminer_failed", level="error", page=index + 1, error=str(e2))
+            return ""
+
+    def _fallback(self):
+        """Replace whatever was read with pdfminer's text of the whole document"""
+        self.fallback_used = True
+        telemetry.FALLBACKS.inc()
+        self.text_size = 0
+        pages = []
+        try:
+            with telemetry.span("pdfminer_fallback"):
+                for text in self._pdfminer_pages():
+                    pages.append(text)
+                    self.pages = pages
+                    self.text_size += len(text)
+                    budget = self._over_budget()
+                    if budget:
+                        self.truncated = budget
+                        break
+        except Exception as e2:
+            telemetry.log("pdfminer_failed", level="error", error=str(e2))
+        self.page_count = len(pages)
+        self.pages = ["".join(pages)]
+        self._finish()
+
+    def _handle(self):
+        """The open PyMuPDF document, opening it on first use"""
+        if self._doc is None:
+            self._doc = self._open()
+            self.page_count = self._doc.page_count
+        return self._doc
+
+    def _open(self):
+        import fitz  # PyMuPDF, imported on the first PDF rather than at startup
+        if self.data is None:
+            return fitz.open(self.pdf_path)
+        try:
+            return fitz.open(stream=self.data, filetype="pdf")
+        except TypeError:
+            # PyMuPDF before 1.25.4 takes bytes only, not a memoryview of
+            # an upload or an mmap; it gets a copy rather than failing over
+            # to pdfminer
+            if not isinstance(self.data, memoryview):
+                raise
+            return fitz.open(stream=self.data.tobytes(), filetype="pdf")
+
+    def _stop(self, budget):
+        telemetry.log("read_budget_exceeded", level="warning", budget=budget, pages_read=len(self.pages))
+        self.truncated = budget
+        self._finish()
+
+    def _finish(self):
+        self._done = True
+        self.close()
+
+    def close(self):
+        """Release the PDF handle if reading stopped early"""
+        if self._parallel:
+            self._parallel.close()
+            self._parallel = False
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
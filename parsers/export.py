@@ -0,0 +1,165 @@
+"""
+Streaming export of parse results.
+
+Each writer takes any iterable of result dicts and yields encoded chunks,
+so a Flask response can stream thousands of statements without holding
+them in memory. Every format uses the same fixed columns, the fields
+returned by GenericParser.parse(). CSV and JSON Lines use only the
+standard library; Parquet and Arrow need pyarrow.
+"""
+
+import csv
+import io
+import json
+
+from parsers.extraction import FIELDS
+
+COLUMNS = ["Bank"] + [field.name for field in FIELDS]
+
+# Rows encoded per yielded chunk
+CHUNK_ROWS = 1000
+
+
+class ExportError(Exception):
+    """Raised when a format cannot be produced"""
+
+
+def _row(result):
+    return [result.get(column, "") if isinstance(result, dict) else "" for column in COLUMNS]
+
+
+def iter_csv(results):
+    """CSV with a header row, in chunks of encoded lines"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    rows = 0
+    for result in results:
+        writer.writerow(_row(result))
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _records(results):
+    for result in results:
+        yield dict(zip(COLUMNS, _row(result)))
+
+
+def iter_jsonl(results):
+    """One JSON object per line"""
+    lines = []
+    for record in _records(results):
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_json_array(results):
+    """A single JSON array, written element by element"""
+    yield b"["
+    first = True
+    for record in _records(results):
+        yield (("" if first else ",") + json.dumps(record, ensure_ascii=False)).encode("utf-8")
+        first = False
+    yield b"]"
+
+
+class _Drain:
+    """Write-only file object whose contents are handed out as they arrive"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _batches(results, pa, schema):
+    """Arrow record batches of CHUNK_ROWS rows each"""
+    columns = [[] for _ in COLUMNS]
+    for result in results:
+        for values, value in zip(columns, _row(result)):
+            values.append(value if value is None or isinstance(value, str) else str(value))
+        if len(columns[0]) == CHUNK_ROWS:
+            yield pa.record_batch(columns, schema=schema)
+            columns = [[] for _ in COLUMNS]
+    if columns[0]:
+        yield pa.record_batch(columns, schema=schema)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportError("Parquet and Arrow export need the pyarrow package")
+    return pyarrow
+
+
+def iter_arrow(results):
+    """Arrow IPC stream, one record batch per chunk"""
+    pa = _pyarrow()
+    schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _batches(results, pa, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def iter_parquet(results):
+    """Parquet file, one row group per chunk"""
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _batches(results, pa, schema):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "jsonl": (iter_jsonl, "application/x-ndjson", "jsonl"),
+    "json": (iter_json_array, "application/json", "json"),
+    "arrow": (iter_arrow, "application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": (iter_parquet, "application/vnd.apache.parquet", "parquet"),
+}
+
+
+def exporter(format):
+    """(writer, mimetype, extension) for a format name, or ExportError"""
+    if format not in FORMATS:
+        raise ExportError(f"Unknown export format '{format}'")
+    if format in ("arrow", "parquet"):
+        _pyarrow()
+    return FORMATS[format]
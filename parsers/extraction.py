@@ -0,0 +1,549 @@
+"""
+Field extraction engine used by GenericParser and the bank parsers.
+
+Every field's pattern cascade is compiled once, the first time it is
+used, so importing the parsers stays cheap on a cold start. Each tier
+carries the keywords its match has to start with ("anchors"). Instead of
+letting the regex walk every offset of the document, the engine finds the
+anchor occurrences in a lower-cased view of the text and only tries the
+pattern there, so a tier whose anchors never occur costs a few substring
+scans. Results are identical to running every pattern with re.search over
+the whole text, in cascade order.
+
+Matching time is bounded three ways. The patterns are written so that no
+attempt backtracks over more than the whitespace or word it stands on
+(possessive quantifiers, bounded runs), each anchored attempt only sees
+MATCH_WINDOW characters from its anchor, and a field whose cascade runs
+past FIELD_DEADLINE seconds gives up with its default value and the tier
+TIMED_OUT, which detect_bank_and_parse() reports in _meta.timed_out.
+The bank parsers' patterns run on the same engine (base_parser.bank_field),
+with anchors, window and deadline alike.
+Tiers without anchors are exempt from the window and the deadline: each
+is one regex.search over the whole text, which nothing can interrupt, so
+the deadline is only checked before it starts. Their patterns are linear
+in the text (benchmarks/bench_regex_stress checks the growth). With
+REGEX_ENGINE=re2 and the google-re2 package installed, patterns that RE2
+accepts run on its linear-time engine; the rest stay on re.
+"""
+
+import functools
+import heapq
+import os
+import re
+import time
+
+from parsers import telemetry
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+NOT_FOUND = "Not Found"
+NO_AMOUNT = "₹0.00"
+
+# "re" or "re2". RE2's \s, \d and \w only match ASCII, so text with
+# non-breaking spaces can extract differently; it is opt-in for that reason.
+REGEX_ENGINE = os.environ.get("REGEX_ENGINE", "re")
+# Characters an anchored attempt may look at past its anchor. Longer than
+# any label and value the cascades are meant to find.
+MATCH_WINDOW = 1024
+# Seconds one field's cascade may take before it gives up
+FIELD_DEADLINE = float(os.environ.get("REGEX_FIELD_DEADLINE", 0.5))
+# Tier reported by Field.extract() for a cascade stopped at its deadline
+TIMED_OUT = "timeout"
+
+# Characters that re.IGNORECASE treats as equal to an ASCII letter but that
+# str.lower() leaves alone. Folding them keeps anchor lookups in step with
+# what the regex engine would match.
+_FOLD = str.maketrans({'\u017f': 's', '\u0131': 'i'})
+_FOLD_UPPER = str.maketrans({'\u212a': 'K', '\u0130': 'I'})
+
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern, flags=0):
+    """
+    pattern compiled by RE2 when REGEX_ENGINE is re2, the package is
+    installed and RE2 supports everything the pattern uses; by re otherwise
+    """
+    if REGEX_ENGINE == "re2" and not flags & ~sum(flag for flag, _ in _INLINE_FLAGS):
+        try:
+            import re2
+        except ImportError:
+            re2 = None
+        if re2 is not None:
+            inline = "".join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+            try:
+                return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+            except re2.error:
+                pass
+    return re.compile(pattern, flags)
+
+
+class MatchTimeout(Exception):
+    """Raised inside a cascade once its field's deadline has passed"""
+
+
+class LazyRegex:
+    """A regular expression compiled the first time it is used"""
+
+    __slots__ = ("pattern", "flags", "_compiled")
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+        self._compiled = None
+
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = compile_pattern(self.pattern, self.flags)
+        return self._compiled
+
+    def __getattr__(self, name):
+        # search, match, finditer, ... of the compiled pattern
+        return getattr(self.compiled(), name)
+
+
+class SearchText:
+    """Document text plus a case-folded view used to locate anchor keywords"""
+
+    def __init__(self, text):
+        self.text = text
+        view = text.lower().translate(_FOLD)
+        # Offsets in the view are only usable if lowering kept the length
+        self.view = view if len(view) == len(text) else None
+        self._first = {}
+        self._first_upper = {}
+        self._upper = None
+
+    @property
+    def upper(self):
+        """Upper-cased text, searched on its own offsets by bank detection"""
+        if self._upper is None:
+            self._upper = self.text.upper().translate(_FOLD_UPPER)
+        return self._upper
+
+    def first_upper(self, anchors):
+        """Earliest offset of any upper-case anchor in the upper-cased text, -1 if none"""
+        best = -1
+        for anchor in anchors:
+            pos = self._first_upper.get(anchor)
+            if pos is None:
+                pos = self._first_upper[anchor] = self.upper.find(anchor)
+            if pos >= 0 and (best < 0 or pos < best):
+                best = pos
+        return best
+
+    def candidates(self, anchors):
+        """Offsets where any of the anchors occurs, in increasing order"""
+        streams = []
+        for anchor in anchors:
+            pos = self._first.get(anchor)
+            if pos is None:
+                pos = self._first[anchor] = self.view.find(anchor)
+            if pos >= 0:
+                streams.append(self._occurrences(anchor, pos))
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams)
+
+    def _occurrences(self, anchor, pos):
+        view = self.view
+        while pos >= 0:
+            yield pos
+            pos = view.find(anchor, pos + 1)
+
+
+class Tier:
+    """One pattern of a field's cascade"""
+
+    def __init__(self, pattern, anchors=()):
+        self.pattern = pattern
+        self.regex = LazyRegex(pattern, FLAGS)
+        self.anchors = anchors
+
+    def search(self, search_text, anchored=True, deadline=None):
+        """
+        Leftmost match in the text, same as regex.search() for matches no
+        longer than MATCH_WINDOW. Raises MatchTimeout once deadline (a
+        time.perf_counter() value) has passed. A search over the whole
+        text, for tiers without anchors or unanchored runs, cannot be
+        interrupted: the deadline is checked before it starts, not during.
+        """
+        if not anchored or not self.anchors or search_text.view is None:
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MatchTimeout
+            return self.regex.search(search_text.text)
+        # Every match starts at an anchor, so trying just those offsets in
+        # order finds the same leftmost match without scanning the rest
+        text = search_text.text
+        match = self.regex.match
+        clock = time.perf_counter
+        for pos in search_text.candidates(self.anchors):
+            if deadline is not None and clock() > deadline:
+                raise MatchTimeout
+            found = match(text, pos, pos + MATCH_WINDOW)
+            if found:
+                return found
+        return None
+
+
+def _clean_text(value):
+    return value.strip()
+
+
+def _clean_amount(value):
+    amount = re.sub(r'\s+', '', value.strip())
+    if not amount.startswith('₹'):
+        amount = '₹' + amount
+    return amount
+
+
+class Field:
+    """A named field resolved by trying its tiers in order"""
+
+    def __init__(self, name, tiers, accept, default=NOT_FOUND, clean=_clean_text, fallback=None, label=None):
+        self.name = name
+        self.tiers = tiers
+        self.accept = accept
+        self.default = default
+        self.clean = clean
+        self.fallback = fallback
+        # Reported for a value any tier found, in place of the tier's index
+        self.label = label
+
+    def extract(self, search_text, anchored=True):
+        """
+        Return (value, tier) where tier is the index of the matching pattern
+        or None. A cascade that runs past FIELD_DEADLINE returns the default
+        with the tier TIMED_OUT.
+        """
+        deadline = time.perf_counter() + FIELD_DEADLINE
+        try:
+            for index, tier in enumerate(self.tiers):
+                match = tier.search(search_text, anchored, deadline)
+                if match:
+                    value = self.clean(match.group(1))
+                    if self.accept(value):
+                        return value, index
+            if self.fallback is not None:
+                value = self.fallback(search_text, anchored, deadline)
+                if value is not None:
+                    return value, len(self.tiers)
+        except MatchTimeout:
+            self._timed_out(len(search_text.text))
+            return self.default, TIMED_OUT
+        return self.default, None
+
+    def settle(self, search_text):
+        """
+        Like extract(), but for text that may still grow at the end.
+
+        Returns None unless the result is certain to be the same once the
+        rest of the document is appended. Past the deadline it returns the
+        default with the tier TIMED_OUT, as extract() does: the same
+        attempts come first in the longer text, so reading on cannot help.
+        """
+        deadline = time.perf_counter() + FIELD_DEADLINE
+        try:
+            for index, tier in enumerate(self.tiers):
+                match = tier.search(search_text, deadline=deadline)
+                if not match or not _is_settled(search_text.text, match.end()):
+                    return None
+                value = self.clean(match.group(1))
+                if self.accept(value):
+                    return value, index
+        except MatchTimeout:
+            self._timed_out(len(search_text.text))
+            return self.default, TIMED_OUT
+        return None
+
+    def _timed_out(self, size):
+        telemetry.REGEX_TIMEOUTS.inc(self.name)
+        telemetry.log("regex_deadline", level="warning", field=self.name, chars=size)
+
+
+# No cascade pattern can consume more than this many lines holding
+# something other than whitespace, separators and card masking. Keep it
+# in step with the patterns below.
+MAX_MATCH_LINES = 9
+_CONTENT_LINE = LazyRegex(r"^[\s:xX*\-]*[^\s:xX*\-]", re.MULTILINE)
+
+
+def _is_settled(text, end):
+    """
+    True if a match ending at end cannot change when text is appended.
+
+    A different outcome needs some match attempt to run into the end of
+    the text, and with MAX_MATCH_LINES + 1 content lines after the match
+    no attempt overlapping it can get that far.
+    """
+    start = text.find("\n", end)
+    if start < 0:
+        return False
+    lines = 0
+    for _ in _CONTENT_LINE.finditer(text, start + 1):
+        lines += 1
+        if lines > MAX_MATCH_LINES:
+            return True
+    return False
+
+
+_LABEL_NAME = r"(?:Name|Card\s*Holder|Customer\s*Name|Primary\s*Card\s*Member|Card\s*Member)"
+_LABEL_NAME_ANCHORS = ("name", "card", "customer", "primary")
+
+CARDHOLDER = Field("Cardholder", [
+    # Label and value on the same line
+    Tier(_LABEL_NAME + r"[:\s]+([^\r\n]+)", _LABEL_NAME_ANCHORS),
+    # Label on one line and value on next line
+    Tier(_LABEL_NAME + r"(?:\s*+:+)?[^\S\n]*\n\s*+([^\r\n]+)", _LABEL_NAME_ANCHORS),
+    # Greetings line
+    Tier(r"(?:Dear|Mr\.?|Mrs\.?|Ms\.?)\s+([^\r\n]+)", ("dear", "mr", "ms")),
+    # Fallback two-or-three word capitalized name, tried at word starts only
+    Tier(r"(?<![a-zA-Z])([A-Z][a-zA-Z]+\s+[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)"),
+], accept=lambda v: v != NOT_FOUND and len(v) > 3)
+
+CARD_NUMBER = Field("Card Last 4 Digits", [
+    Tier(r"(?:Card\s*(?:Number|No\.?|#)|ending\s*(?:in|with)|xxxx)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "ending", "xxxx")),
+    Tier(r"[xX*]{4,12}[\s\-]?(\d{4})", ("x", "*")),
+    Tier(r"(?:Card|A\/C)[:\s]*+[xX*\s\-]{0,32}?(\d{4})", ("card", "a/c")),
+], accept=lambda v: v != NOT_FOUND and v.isdigit() and len(v) == 4)
+
+BILLING_CYCLE = Field("Billing Cycle", [
+    Tier(r"(?:Statement\s*(?:Period|Date)|Billing\s*(?:Period|Cycle|From))[:\s]*+(\d{1,2}[/-]\w{3,9}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\w{3,9}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})", ("statement", "billing")),
+    Tier(r"(?:From|Period)[:\s]*+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*(?:to|-|–)\s*\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", ("from", "period")),
+    Tier(r"(\d{1,2}\s+\w{3,9}\s+\d{4}\s*(?:to|-|–)\s*\d{1,2}\s+\w{3,9}\s+\d{4})"),
+], accept=lambda v: v != NOT_FOUND)
+
+_TOTAL_DUE_LINE = LazyRegex(r"total\s*(amount\s*)?due", re.IGNORECASE)
+_NEARBY_AMOUNT = LazyRegex(r"([\d]{1,3}(?:[, ]\d{2,3})+(?:\.\d{1,2})?|\d+\.\d{1,2}|\d{4,})")
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _line_start(text, pos):
+    """Offset where the line containing pos begins, as str.splitlines() sees it"""
+    return max(text.rfind(c, 0, pos) for c in _LINE_BREAKS) + 1
+
+
+def _lines_from(text, start, count):
+    """The first count lines of text[start:], split like str.splitlines()"""
+    size = 256
+    while True:
+        lines = text[start:start + size].splitlines()
+        # A further line means the first count lines and their breaks are complete
+        if len(lines) > count or start + size >= len(text):
+            return lines[:count]
+        size *= 4
+
+
+def _total_due_nearby(search_text, anchored=True, deadline=None):
+    """Scan lines near 'Total Due' and pick the first valid amount on the same or next two lines"""
+    text = search_text.text
+    try:
+        if not anchored:
+            lines = text.splitlines()
+            for i, line in enumerate(lines):
+                if _TOTAL_DUE_LINE.search(line):
+                    m = _NEARBY_AMOUNT.search("\n".join(lines[i:i+3]))
+                    if m:
+                        return _clean_amount(m.group(1))
+            return None
+        if search_text.view is None:
+            start = 0
+        else:
+            start = next(iter(search_text.candidates(("total",))), -1)
+            if start < 0:
+                return None
+        # Any line holding the label also holds a whole-text match, so only
+        # the lines those matches fall on need to be looked at
+        seen = -1
+        for hit in _TOTAL_DUE_LINE.finditer(text, start):
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MatchTimeout
+            line_start = _line_start(text, hit.start())
+            if line_start == seen:
+                continue
+            seen = line_start
+            lines = _lines_from(text, line_start, 3)
+            if lines and _TOTAL_DUE_LINE.search(lines[0]):
+                m = _NEARBY_AMOUNT.search("\n".join(lines))
+                if m:
+                    return _clean_amount(m.group(1))
+    except MatchTimeout:
+        raise
+    except Exception:
+        pass
+    return None
+
+
+TOTAL_DUE = Field("Total Due", [
+    # Core labels excluding date contexts (Payment Due Date / Due Date)
+    Tier(r"(?:Total\s*(?:Amount\s*)?Due|Amount\s*Payable|Outstanding|New\s*Balance|Payment\s*Due(?!\s*Date))[^\d\r\n]{0,20}(?:\n\s*+)?(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total", "amount", "outstanding", "new", "payment")),
+    # 'Total' followed by amount (avoid generic 'Due' to prevent 'Due Date' collisions)
+    Tier(r"Total[^\d\r\n]{0,20}(?:\n\s*+)?(?:Rs\.?|INR|₹)?\s*+([\d,]+\.?\d*)", ("total",)),
+    # Currency first patterns
+    Tier(r"(?:Rs\.?|INR|₹)\s*+([\d,]++\.?+\d*+)\s*(?:Due|Payable)", ("rs", "inr", "₹")),
+], accept=lambda v: v != NO_AMOUNT, default=NO_AMOUNT, clean=_clean_amount, fallback=_total_due_nearby)
+
+DUE_DATE = Field("Payment Due Date", [
+    Tier(r"(?:Payment\s*Due\s*(?:Date|By|On)|Due\s*(?:Date|By|On)|Pay\s*By)[:\s]*+(\d{1,2}[/-]\w{3,9}[/-]\d{2,4}|\d{1,2}\s+\w{3,9}\s+\d{4})", ("pay", "due")),
+    Tier(r"(?:Due\s*Date)[:\s]*+(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})", ("due",)),
+    Tier(r"(?:Pay\s*By|Due)[:\s]*+(\d{1,2}\s+\w{3,9}\s+\d{4})", ("pay", "due")),
+], accept=lambda v: v != NOT_FOUND)
+
+FIELDS = (CARDHOLDER, CARD_NUMBER, BILLING_CYCLE, TOTAL_DUE, DUE_DATE)
+
+# Checked in order; the first bank whose pattern occurs anywhere wins
+BANK_PATTERNS = [(LazyRegex(pattern, re.IGNORECASE), anchors, name) for pattern, anchors, name in [
+    (r'(HDFC\s*Bank)', ('HDFC',), 'HDFC Bank'),
+    (r'(ICICI\s*Bank)', ('ICICI',), 'ICICI Bank'),
+    (r'(SBI\s*Card)', ('SBI',), 'SBI Card'),
+    (r'(State\s*Bank)', ('STATE',), 'State Bank of India'),
+    (r'(Axis\s*Bank)', ('AXIS',), 'Axis Bank'),
+    (r'(American\s*Express|AMEX)', ('AMERICAN', 'AMEX'), 'American Express'),
+    (r'(Punjab\s*National\s*Bank|PNB)', ('PUNJAB', 'PNB'), 'Punjab National Bank'),
+    (r'(Kotak\s*Mahindra)', ('KOTAK',), 'Kotak Mahindra Bank'),
+    (r'(Yes\s*Bank)', ('YES',), 'Yes Bank'),
+    (r'(IndusInd\s*Bank)', ('INDUSIND',), 'IndusInd Bank'),
+    (r'(Citibank|Citi)', ('CITI',), 'Citibank'),
+    (r'(Standard\s*Chartered)', ('STANDARD',), 'Standard Chartered'),
+    (r'(HSBC)', ('HSBC',), 'HSBC'),
+    (r'(RBL\s*Bank)', ('RBL',), 'RBL Bank'),
+    (r'(Bank\s*of\s*Baroda|BOB)', ('BANK', 'BOB'), 'Bank of Baroda'),
+    (r'(Canara\s*Bank)', ('CANARA',), 'Canara Bank'),
+    (r'(Union\s*Bank)', ('UNION',), 'Union Bank of India'),
+    (r'(IDFC\s*First)', ('IDFC',), 'IDFC FIRST Bank'),
+]]
+UNKNOWN_BANK = "Unknown Bank"
+
+# Every bank pattern in one alternation, one named group per bank, so a
+# single scan of the text finds the mentions of all of them. The lookahead
+# on the anchors' first letters rejects most word starts before any
+# alternative is tried.
+_BANK_SCAN = LazyRegex(
+    r"\b(?=[%s])(?:%s)\b" % (
+        "".join(sorted({anchor[0] for _, anchors, _ in BANK_PATTERNS for anchor in anchors})),
+        "|".join(f"(?P<b{index}>{regex.pattern})" for index, (regex, _, _) in enumerate(BANK_PATTERNS)),
+    ),
+    re.IGNORECASE,
+)
+
+
+def score_banks(text):
+    """
+    Mentions of each known bank in text, in one pass. The first mention
+    counts twice, since the issuer's name heads the statement and other
+    banks mostly turn up later in card types or transaction descriptions.
+    """
+    scores = {}
+    for match in _BANK_SCAN.finditer(text):
+        bank_name = BANK_PATTERNS[int(match.lastgroup[1:])][2]
+        scores[bank_name] = scores.get(bank_name, 0) + (1 if scores else 2)
+    return scores
+
+
+def compile_all():
+    """Compile every pattern now instead of on first use"""
+    for field in FIELDS:
+        for tier in field.tiers:
+            tier.regex.compiled()
+    for regex, _, _ in BANK_PATTERNS:
+        regex.compiled()
+    for regex in (_BANK_SCAN, _CONTENT_LINE, _TOTAL_DUE_LINE, _NEARBY_AMOUNT):
+        regex.compiled()
+
+
+def identify_bank(text):
+    """(bank name, confidence) of the best scoring bank; (None, 0.0) if none is mentioned"""
+    scores = score_banks(text)
+    if not scores:
+        return None, 0.0
+    bank_name = max(scores, key=scores.get)
+    return bank_name, scores[bank_name] / sum(scores.values())
+
+
+def detect_bank(search_text, anchored=True):
+    """Name of the first known bank mentioned in the text"""
+    for regex, anchors, bank_name in BANK_PATTERNS:
+        start = search_text.first_upper(anchors) if anchored else 0
+        if start >= 0 and regex.search(search_text.upper, start):
+            return bank_name
+    return UNKNOWN_BANK
+
+
+def detect_bank_found(search_text):
+    """Like detect_bank(), but None when no bank is mentioned yet"""
+    bank_name = detect_bank(search_text)
+    return None if bank_name == UNKNOWN_BANK else bank_name
+
+
+def extract_fields(text, anchored=True):
+    """
+    Extract every GenericParser field from text.
+
+    Pass anchored=False to run each pattern over the whole document, the
+    way the parsers used to; useful as a reference in benchmarks.
+    """
+    search_text = text if isinstance(text, SearchText) else SearchText(text)
+    data = {"Bank": detect_bank(search_text, anchored)}
+    for field in FIELDS:
+        data[field.name] = field.extract(search_text, anchored)[0]
+    return data
+
+
+def extract_fields_lazy(document, tiers=None, fields=FIELDS, bank=None):
+    """
+    Extract every GenericParser field, or the given fields, reading pages
+    of the document only as far as needed. If tiers is a dict, the label
+    of the tier that settled each field is stored in it by field name.
+    bank, if given, is reported as the bank instead of detecting one.
+
+    The pages read so far are checked after 1, 2, 4, ... pages and each
+    field is fixed as soon as its cascade result can no longer change.
+    The bank is taken from the first pages that name one, since that is
+    where the issuer's header sits. Whatever is still open once the
+    window stops growing is extracted from the whole document.
+    """
+    data = {} if bank is None else {"Bank": bank}
+    pending = list(fields)
+    pages = 1
+    while True:
+        prefix, complete = document.prefix(pages)
+        if complete or document.fallback_used:
+            break
+        search_text = SearchText(prefix)
+        if "Bank" not in data:
+            bank_name = detect_bank_found(search_text)
+            if bank_name is not None:
+                data["Bank"] = bank_name
+        for field in list(pending):
+            settled = field.settle(search_text)
+            if settled is not None:
+                data[field.name] = settled[0]
+                telemetry.count_tier(field, settled[1])
+                if tiers is not None:
+                    tiers[field.name] = telemetry.tier_label(field, settled[1])
+                pending.remove(field)
+        if not pending and "Bank" in data:
+            return _in_field_order(data, fields)
+        pages *= 2
+
+    if document.fallback_used:
+        # The PDF had to be re-read by another extractor; start over on its text
+        data = {} if bank is None else {"Bank": bank}
+        pending = list(fields)
+    search_text = document.search_text()
+    if "Bank" not in data:
+        data["Bank"] = detect_bank(search_text)
+    for field in pending:
+        data[field.name], tier = field.extract(search_text)
+        telemetry.count_tier(field, tier)
+        if tiers is not None:
+            tiers[field.name] = telemetry.tier_label(field, tier)
+    return _in_field_order(data, fields)
+
+
+def _in_field_order(data, fields):
+    result = {"Bank": data["Bank"]}
+    for field in fields:
+        result[field.name] = data[field.name]
+    return result
@@ -0,0 +1,269 @@
+"""
+Near-duplicate detection over statement text.
+
+The same statement often arrives as different bytes: downloaded again,
+re-saved, or stamped with a new watermark. Its text barely changes, so
+the text is what gets fingerprinted. signature() lower-cases it, splits it
+into words and takes every run of SHINGLE_WORDS words; each distinct
+shingle is hashed once into one of BINS bins, and the smallest hash in
+each bin forms a MinHash signature (one-permutation MinHash). The share
+of bins two signatures agree on estimates how much of their text they
+share.
+
+Only the pages the parse has read, at most PREFIX_PAGES of them, are
+fingerprinted (document_signature()), so the check reads no page of its
+own, and the summary below comes from the parse's own fields.
+
+Two statements of one issuer share most of their text: the same layout,
+labels and boilerplate, differing only in a few amounts and dates. Text
+similarity alone cannot tell them from a re-download, so every signature
+is stored with a summary_key() of the fields that can: card last 4, total
+due and due date. Only a statement with the same summary is a match.
+
+FingerprintIndex finds earlier signatures close to a new one without
+looking at all of them. Signatures are cut into BANDS bands; each band is
+hashed to a key, and only documents sharing at least one band key with
+the new signature are compared. Documents sharing 90% of their shingles
+are found about 99% of the time. The index lives in memory, holding up to
+MAX_ENTRIES statements and dropping the least recently added or matched
+one past that, or in a SQLite file that survives restarts and is shared
+between workers.
+"""
+
+import hashlib
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+from parsers.extraction import CARD_NUMBER, DUE_DATE, NO_AMOUNT, NOT_FOUND, TOTAL_DUE
+
+# Pages of a document that are fingerprinted, at most
+PREFIX_PAGES = int(os.environ.get("FINGERPRINT_PAGES", 4))
+# Statements an in-memory index keeps, at about 2 KB each
+MAX_ENTRIES = int(os.environ.get("FINGERPRINT_MAX_ENTRIES", 20_000))
+# Words per shingle
+SHINGLE_WORDS = 5
+# Bins of the MinHash signature, and bands x rows the index cuts it into
+BINS = 64
+BANDS = 8
+ROWS = BINS // BANDS
+# Below this many distinct shingles there is too little text to tell
+# statements apart, and signature() returns None
+MIN_SHINGLES = 50
+# Share of bins two signatures must agree on to count as near-duplicates
+THRESHOLD = 0.9
+
+EMPTY = 0xFFFFFFFF  # bin no shingle fell into
+
+# Fields that tell two statements with the same layout apart
+SUMMARY_FIELDS = (CARD_NUMBER.name, TOTAL_DUE.name, DUE_DATE.name)
+
+_WORD = re.compile(r"\w+")
+_MASK = (1 << 64) - 1
+_BIN_SHIFT = 64 - (BINS - 1).bit_length()
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS fingerprints ("
+    " id INTEGER PRIMARY KEY,"
+    " cache_key TEXT NOT NULL UNIQUE,"
+    " content_hash TEXT,"
+    " summary TEXT,"
+    " signature BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS bands (key INTEGER NOT NULL, id INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS bands_key ON bands (key)",
+]
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Set of 32-bit hashes of every size consecutive words of text, lower-cased"""
+    words = _WORD.findall(text.lower())
+    ids = {word: zlib.crc32(word.encode()) for word in set(words)}
+    numbers = [ids[word] for word in words]
+    # Each distinct run of word ids is hashed once
+    pack = struct.Struct(f"<{size}I").pack
+    return {zlib.crc32(pack(*run)) for run in set(zip(*(numbers[offset:] for offset in range(size))))}
+
+
+def signature(text):
+    """MinHash signature of text as a tuple of BINS ints, or None if the text is too short"""
+    hashes = shingles(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    bins = [EMPTY] * BINS
+    for value in hashes:
+        # Spread the shingle hash over 64 bits: the top ones pick the bin
+        value = (value * 0x9E3779B97F4A7C15) & _MASK
+        value ^= value >> 29
+        index = value >> _BIN_SHIFT
+        value &= 0xFFFFFFFF
+        if value < bins[index]:
+            bins[index] = value
+    return tuple(bins)
+
+
+def document_signature(document):
+    """
+    signature() of the pages of a parsers.document.Document read so far,
+    up to PREFIX_PAGES; no page is read for it
+    """
+    return signature("".join(document.pages[:PREFIX_PAGES]))
+
+
+def summary_key(fields):
+    """
+    The SUMMARY_FIELDS of a parse result or extract_fields() dict joined
+    into one string, or None if any of them was not found
+    """
+    values = [fields.get(name, NOT_FOUND) for name in SUMMARY_FIELDS]
+    if any(value in (NOT_FOUND, NO_AMOUNT) for value in values):
+        return None
+    return "|".join(values)
+
+
+def similarity(a, b):
+    """Estimated share of shingles two signatures have in common, 0 to 1"""
+    compared = same = 0
+    for x, y in zip(a, b):
+        if x != EMPTY or y != EMPTY:
+            compared += 1
+            same += x == y
+    return same / compared if compared else 0.0
+
+
+def band_keys(sig):
+    """One signed 64-bit key per band of a signature"""
+    keys = []
+    for band in range(BANDS):
+        packed = struct.pack(f"<B{ROWS}I", band, *sig[band * ROWS:(band + 1) * ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little", signed=True))
+    return keys
+
+
+class FingerprintIndex:
+    """Signatures of earlier statements, searchable for near-duplicates by band keys"""
+
+    def __init__(self, db_path=None, threshold=THRESHOLD, max_entries=MAX_ENTRIES):
+        """max_entries caps an in-memory index (None for no cap); a SQLite one keeps everything"""
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # In memory: id -> (cache key, content hash, summary, signature), least
+        # recently used first; band key -> ids; cache key -> id
+        self._entries = OrderedDict()
+        self._bands = {}
+        self._keys = {}
+        self._next_id = 0
+        self.evictions = 0
+        if db_path:
+            db = self._db()
+            with db:
+                for statement in _SCHEMA:
+                    db.execute(statement)
+
+    def add(self, sig, cache_key, content_hash=None, summary=None):
+        """
+        Index the signature of the statement stored under cache_key, with
+        its summary_key(); a repeated cache_key is ignored
+        """
+        self.add_many([(sig, cache_key, content_hash, summary)])
+
+    def add_many(self, items):
+        """Index (signature, cache key, content hash, summary) tuples, in one transaction on disk"""
+        if self.db_path:
+            db = self._db()
+            with db:
+                for sig, cache_key, content_hash, summary in items:
+                    cursor = db.execute(
+                        "INSERT OR IGNORE INTO fingerprints (cache_key, content_hash, summary, signature)"
+                        " VALUES (?, ?, ?, ?)",
+                        (cache_key, content_hash, summary, array("I", sig).tobytes()),
+                    )
+                    if cursor.rowcount:
+                        db.executemany("INSERT INTO bands (key, id) VALUES (?, ?)",
+                                       [(key, cursor.lastrowid) for key in band_keys(sig)])
+            return
+        with self._lock:
+            for sig, cache_key, content_hash, summary in items:
+                if cache_key in self._keys:
+                    self._entries.move_to_end(self._keys[cache_key])
+                    continue
+                entry_id = self._next_id
+                self._next_id += 1
+                # An array of 32-bit bins takes a tenth of a tuple of ints
+                self._entries[entry_id] = (cache_key, content_hash, summary, array("I", sig))
+                self._keys[cache_key] = entry_id
+                for key in band_keys(sig):
+                    self._bands.setdefault(key, []).append(entry_id)
+                if self.max_entries is not None and len(self._entries) > self.max_entries:
+                    self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entry and its ids under every band key; the lock is held"""
+        entry_id, (cache_key, _, _, sig) = self._entries.popitem(last=False)
+        del self._keys[cache_key]
+        for key in band_keys(sig):
+            ids = self._bands[key]
+            ids.remove(entry_id)
+            if not ids:
+                del self._bands[key]
+        self.evictions += 1
+
+    def query(self, sig, summary=None, threshold=None):
+        """
+        The closest earlier statement at least threshold similar and with
+        the same summary, as a dict with cache_key, content_hash and
+        similarity, or None
+        """
+        threshold = self.threshold if threshold is None else threshold
+        best = None
+        for cache_key, content_hash, other_summary, other in self._candidates(band_keys(sig)):
+            if other_summary != summary:
+                continue
+            score = similarity(sig, other)
+            if score >= threshold and (best is None or score > best["similarity"]):
+                best = {"cache_key": cache_key, "content_hash": content_hash, "similarity": round(score, 3)}
+        if best is not None and not self.db_path:
+            with self._lock:
+                entry_id = self._keys.get(best["cache_key"])
+                if entry_id is not None:
+                    self._entries.move_to_end(entry_id)
+        return best
+
+    def stats(self):
+        if self.db_path:
+            count = self._db().execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+            return {"fingerprints": count, "threshold": self.threshold, "path": self.db_path}
+        return {"fingerprints": len(self._entries), "threshold": self.threshold, "path": None,
+                "max_entries": self.max_entries, "evictions": self.evictions}
+
+    def _candidates(self, keys):
+        """(cache key, content hash, summary, signature) of every statement sharing a band key"""
+        if self.db_path:
+            marks = ", ".join("?" * len(keys))
+            rows = self._db().execute(
+                "SELECT cache_key, content_hash, summary, signature FROM fingerprints WHERE id IN"
+                f" (SELECT id FROM bands WHERE key IN ({marks}))",
+                keys,
+            ).fetchall()
+            return [(cache_key, content_hash, summary, array("I", blob))
+                    for cache_key, content_hash, summary, blob in rows]
+        with self._lock:
+            ids = {entry_id for key in keys for entry_id in self._bands.get(key, ())}
+            return [self._entries[entry_id] for entry_id in ids]
+
+    def _db(self):
+        """SQLite connection for the calling thread"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3  # only needed when the index is kept on disk
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
@@ -0,0 +1,168 @@
+"""
+In-process job queue for parsing in the background.
+
+submit() puts a job on a bounded queue and returns its id at once; a fixed
+number of worker threads take jobs off the queue and run them. When the
+queue is full submit() raises QueueFull instead of letting work pile up.
+Finished jobs are kept for ttl seconds, then dropped. Everything lives in
+this process, so no broker is needed, and nothing survives a restart.
+"""
+
+import queue
+import threading
+import time
+import uuid
+
+from parsers import telemetry
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import UnparseablePDF
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised by submit() when no more jobs can be queued"""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """Bounded queue of parse jobs drained by a pool of worker threads"""
+
+    def __init__(self, work=detect_bank_and_parse, workers=2, max_queued=32, ttl=3600):
+        self.work = work
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self._threads = []
+        self._started = threading.Lock()
+        # Running average of job duration, for Retry-After estimates
+        self._average_seconds = 1.0
+
+    def submit(self, source, name=None, on_done=None):
+        """
+        Queue source (anything detect_bank_and_parse accepts) and return the
+        job id. on_done(result) is called in the worker after a success.
+        """
+        self._start_workers()
+        self._purge()
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "source": name, "status": QUEUED, "created": time.time()}
+        with self._changed:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, source, on_done))
+        except queue.Full:
+            with self._changed:
+                del self._jobs[job_id]
+            raise QueueFull(self.retry_after())
+        return job_id
+
+    def complete(self, result, name=None):
+        """Record a job that is already done, e.g. served from the result cache"""
+        self._purge()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._changed:
+            self._jobs[job_id] = {
+                "id": job_id, "source": name, "status": DONE,
+                "created": now, "finished": now, "result": result,
+            }
+        return job_id
+
+    def get(self, job_id):
+        """Copy of the job's record, or None if it is unknown or expired"""
+        self._purge()
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, timeout):
+        """Like get(), but wait up to timeout seconds for the job to finish"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] in (DONE, FAILED):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return dict(job) if job is not None else None
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up, at least 1"""
+        backlog = self._queue.qsize() / self.workers
+        return max(1, round(backlog * self._average_seconds))
+
+    def stats(self):
+        with self._changed:
+            statuses = [job["status"] for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": self._queue.qsize(),
+            "running": statuses.count(RUNNING),
+            "stored": len(statuses),
+            "average_seconds": round(self._average_seconds, 3),
+        }
+
+    def _start_workers(self):
+        # Threads start with the first job, not at import time
+        with self._started:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"parse-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job_id, source, on_done = self._queue.get()
+            self._set(job_id, status=RUNNING, started=time.time())
+            start = time.perf_counter()
+            try:
+                result = self.work(source)
+                if result is None:
+                    self._set(job_id, status=FAILED, error="Could not parse the statement")
+                else:
+                    if on_done is not None:
+                        on_done(result)
+                    self._set(job_id, status=DONE, result=result)
+            except UnparseablePDF as e:
+                self._set(job_id, status=FAILED, **e.to_dict())
+            except Exception as e:
+                telemetry.log("job_failed", level="error", job=job_id, error=str(e))
+                self._set(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                telemetry.observe("job", elapsed)
+                self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+                self._queue.task_done()
+
+    def _set(self, job_id, **fields):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                if fields.get("status") in (DONE, FAILED):
+                    job["finished"] = time.time()
+            self._changed.notify_all()
+
+    def _purge(self):
+        """Drop finished jobs older than ttl"""
+        cutoff = time.time() - self.ttl
+        with self._changed:
+            expired = [job_id for job_id, job in self._jobs.items() if job.get("finished", cutoff + 1) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
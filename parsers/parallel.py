@@ -0,0 +1,182 @@
+"""
+Reading the pages of one large PDF across worker processes.
+
+Decoding page text is CPU-bound and holds the GIL, so a long statement is
+read one page after another on one core however many are idle. For
+documents of PARALLEL_PAGES pages or more, Document hands the reading to
+a ParallelReader once its first MIN_CHUNK_PAGES pages, read in this
+process, are not enough: the rest of the page range is cut into chunks,
+and a process pool that lives as long as the server reads them. A
+statement whose fields settle on its first pages never starts the pool
+or copies its bytes. Each worker opens its own PyMuPDF handle on the
+file, or on a copy of the bytes shared through a file in /dev/shm, so
+the bytes are neither pickled nor copied per worker.
+Chunks are submitted a pool's worth ahead of the reader and handed back
+strictly in page order, so whoever reads the Document sees the first
+pages, and can run the field cascades on them, while later chunks are
+still being decoded; once the cascades are settled and the Document
+closes, chunks not yet started are cancelled.
+
+Worker processes are started with forkserver (spawn where there is none),
+never forked from the server: a fork copies whatever locks other threads
+hold at that moment, and a child could wait on one forever.
+"""
+
+import os
+import tempfile
+import threading
+
+from parsers import telemetry
+
+# Documents with fewer pages are read in this process
+PARALLEL_PAGES = int(os.environ.get("PDF_PARALLEL_PAGES", 64))
+# Size of the shared pool; 0 or 1 turns parallel reading off
+PARALLEL_WORKERS = int(os.environ.get("PDF_PARALLEL_WORKERS", 0)) or os.cpu_count() or 1
+# Pages per chunk: small first chunks get the first pages back quickly,
+# CHUNK_PAGES at most keeps every worker busy to the end
+MIN_CHUNK_PAGES = 4
+CHUNK_PAGES = 32
+
+# Pools by size; the server only ever uses the PARALLEL_WORKERS one
+_pools = {}
+_pool_lock = threading.Lock()
+# Worker side: (file key, Document) of the last file read, reused between
+# chunks of it; the key changes when a different file replaces the path
+_worker_document = (None, None)
+
+
+def page_ranges(count, parts):
+    """parts contiguous (start, stop) ranges covering count pages"""
+    size, extra = divmod(count, parts)
+    ranges, start = [], 0
+    for index in range(parts):
+        stop = start + size + (index < extra)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def chunk_ranges(start, stop, workers):
+    """(start, stop) chunks from start to stop, growing from MIN_CHUNK_PAGES up to CHUNK_PAGES"""
+    ranges = []
+    size = MIN_CHUNK_PAGES
+    limit = max(MIN_CHUNK_PAGES, min(CHUNK_PAGES, -(-(stop - start) // (workers * 2))))
+    while start < stop:
+        ranges.append((start, min(start + size, stop)))
+        start += size
+        size = min(size * 2, limit)
+    return ranges
+
+
+def process_context():
+    """multiprocessing context for worker pools: forkserver, or spawn where there is none"""
+    import multiprocessing
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def pool(workers=None):
+    """The shared pool of that many worker processes, started on first use; None if processes are unavailable"""
+    workers = workers or PARALLEL_WORKERS
+    with _pool_lock:
+        if workers not in _pools:
+            from concurrent.futures import ProcessPoolExecutor
+            try:
+                _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+            except (OSError, NotImplementedError) as e:
+                telemetry.log("process_pool_unavailable", level="warning", error=str(e))
+                _pools[workers] = None
+        return _pools[workers]
+
+
+def use_parallel(page_count, workers=None):
+    """Whether a document of page_count pages should be read by a ParallelReader"""
+    import multiprocessing
+    workers = PARALLEL_WORKERS if workers is None else workers
+    # Only the main process fans out; batch and split workers read in place
+    return workers > 1 and page_count >= PARALLEL_PAGES and multiprocessing.parent_process() is None
+
+
+def _read_chunk(path, backend, start, stop, keep):
+    """
+    Worker: (texts, fallback page indexes) of pages start to stop - 1 of
+    the file at path. keep leaves the file open for the next chunk; a
+    temporary copy is closed after each one, so nothing holds it once it
+    is removed.
+    """
+    global _worker_document
+    from parsers.document import Document
+    stat = os.stat(path)
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size, backend)
+    cached_key, document = _worker_document
+    _worker_document = (None, None)
+    if document is not None and cached_key != key:
+        document.close()
+        document = None
+    if document is None:
+        document = Document(path, page_budget=None, time_budget=None, text_budget=None, backend=backend)
+    try:
+        document.fallback_pages = []
+        return document.read_pages(start, stop), document.fallback_pages
+    finally:
+        if keep:
+            _worker_document = (key, document)
+        else:
+            document.close()
+
+
+class ParallelReader:
+    """Pages start to stop - 1 of a Document, read in chunks by the shared pool and returned in order"""
+
+    def __init__(self, document, start, stop, executor, workers):
+        self.document = document
+        self._executor = executor
+        self._copy = None
+        path = document.pdf_path
+        if path is None:
+            path = self._copy = _shared_copy(document.data)
+        self._path = os.fspath(path)
+        self._chunks = chunk_ranges(start, stop, workers)[::-1]
+        self._futures = []
+        self._buffer = []
+        # One chunk per worker in flight; the next goes in as one is handed out
+        for _ in range(workers):
+            self._submit()
+
+    def _submit(self):
+        if self._chunks:
+            chunk_start, chunk_stop = self._chunks.pop()
+            self._futures.append(self._executor.submit(
+                _read_chunk, self._path, self.document.backend, chunk_start, chunk_stop, self._copy is None))
+
+    def next_page(self):
+        """Text of the next page, waiting for its chunk; None when every chunk has been handed out"""
+        if not self._buffer:
+            if not self._futures:
+                return None
+            texts, fallback_pages = self._futures.pop(0).result()
+            self._submit()
+            self.document.fallback_pages.extend(fallback_pages)
+            self._buffer = texts[::-1]
+        return self._buffer.pop()
+
+    def close(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._chunks = []
+        if self._copy is not None:
+            try:
+                os.unlink(self._copy)
+            except OSError:
+                pass
+            self._copy = None
+
+
+def _shared_copy(data):
+    """Path of a temporary copy of data, in shared memory where there is some"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.NamedTemporaryFile(prefix="pdf-", suffix=".pdf", dir=directory, delete=False) as f:
+        f.write(data)
+        return f.name
@@ -0,0 +1,210 @@
+"""
+Typed statement records.
+
+detect_bank_and_parse() returns display strings ("₹12,345.00", "Not
+Found", "05 Jan 2024"). StatementRecord holds the same statement with
+amounts in integer paise, dates as datetime.date and MISSING for anything
+the parsers could not find, plus the cascade tier that settled each field.
+Amounts and dates are normalized by hand with a precomputed month table
+rather than a general date parser; dates are read day first, as Indian
+statements print them. to_dict() gives back the original result.
+"""
+
+import datetime
+
+from parsers.extraction import NOT_FOUND, NO_AMOUNT, UNKNOWN_BANK
+
+
+class _Missing:
+    """Type of MISSING"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        # Unpickles to the same object, so `is MISSING` keeps working
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+_MONTH_NAMES = ("january", "february", "march", "april", "may", "june", "july",
+                "august", "september", "october", "november", "december")
+# Full names, three-letter abbreviations and "sept", lower case, to month number
+MONTHS = {}
+for _number, _name in enumerate(_MONTH_NAMES, 1):
+    MONTHS[_name] = MONTHS[_name[:3]] = _number
+MONTHS["sept"] = 9
+
+# Characters between the day, month and year of a date, and around the
+# "to" or dash of a date range
+_SEPARATORS = str.maketrans({"/": " ", "-": " ", "–": " ", ",": " ", ".": " "})
+
+
+def parse_amount(text):
+    """Integer paise from an amount string like "₹12,345.50", or MISSING"""
+    if not text or text == NO_AMOUNT:
+        return MISSING
+    whole, _, fraction = text.lstrip("₹").replace(",", "").replace(" ", "").partition(".")
+    if whole and not whole.isdigit() or fraction and not fraction.isdigit() or not whole and not fraction:
+        return MISSING
+    return int(whole or "0") * 100 + int((fraction + "00")[:2])
+
+
+def format_amount(paise):
+    """Display string for integer paise, e.g. ₹12,345.50 for 1234550"""
+    return f"₹{paise // 100:,}.{paise % 100:02d}"
+
+
+def format_date(value):
+    """Display string for a date, e.g. 05 Jan 2024"""
+    return f"{value.day:02d} {_MONTH_NAMES[value.month - 1][:3].title()} {value.year}"
+
+
+def _date(day, month, year):
+    """datetime.date from day, month and year tokens, or MISSING"""
+    if not day.isdigit() or not year.isdigit():
+        return MISSING
+    if month.isdigit():
+        month_number = int(month)
+    else:
+        month_number = MONTHS.get(month.lower())
+        if month_number is None:
+            return MISSING
+    year_number = int(year)
+    if len(year) == 2:
+        year_number += 2000
+    try:
+        return datetime.date(year_number, month_number, int(day))
+    except ValueError:
+        return MISSING
+
+
+def _range_tokens(text):
+    tokens = []
+    for token in text.translate(_SEPARATORS).split():
+        if token.lower() == "to":
+            continue
+        # "2025to01" when the range had no spaces around "to"
+        head, to, tail = token.lower().partition("to")
+        if to and head.isdigit() and tail.isdigit():
+            tokens.extend((head, tail))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def parse_date(text):
+    """datetime.date from "05 Jan 2024", "05-Jan-24", "05/01/2024" and the like, or MISSING"""
+    if not text or text == NOT_FOUND:
+        return MISSING
+    tokens = text.translate(_SEPARATORS).split()
+    if len(tokens) != 3:
+        return MISSING
+    return _date(*tokens)
+
+
+def parse_date_range(text):
+    """(start, end) dates of a billing cycle like "01 Sep 2025 - 30 Sep 2025"; MISSING for each part not found"""
+    if not text or text == NOT_FOUND:
+        return MISSING, MISSING
+    tokens = _range_tokens(text)
+    if len(tokens) != 6:
+        return MISSING, MISSING
+    return _date(*tokens[:3]), _date(*tokens[3:])
+
+
+def _text(value, missing=NOT_FOUND):
+    return MISSING if value in (None, missing) else value
+
+
+def _json_value(value):
+    if value is MISSING:
+        return None
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+class StatementRecord:
+    """One parsed statement with typed fields"""
+
+    __slots__ = ("bank", "cardholder", "card_last4", "billing_start", "billing_end",
+                 "total_due_paise", "due_date", "tiers", "_result")
+
+    # Typed attribute for each field of the display result
+    FIELDS = ("bank", "cardholder", "card_last4", "billing_start", "billing_end", "total_due_paise", "due_date")
+
+    def __init__(self, bank=MISSING, cardholder=MISSING, card_last4=MISSING, billing_start=MISSING,
+                 billing_end=MISSING, total_due_paise=MISSING, due_date=MISSING, tiers=None):
+        self.bank = bank
+        self.cardholder = cardholder
+        self.card_last4 = card_last4
+        self.billing_start = billing_start
+        self.billing_end = billing_end
+        self.total_due_paise = total_due_paise
+        self.due_date = due_date
+        # Field name -> tier label as in parser_pattern_hits_total, or
+        # "bank_parser" for values from a bank's own parser
+        self.tiers = tiers or {}
+        self._result = None
+
+    @classmethod
+    def from_result(cls, result):
+        """Record for a dict returned by detect_bank_and_parse()"""
+        billing_start, billing_end = parse_date_range(result.get("Billing Cycle"))
+        record = cls(
+            bank=_text(result.get("Bank"), UNKNOWN_BANK),
+            cardholder=_text(result.get("Cardholder")),
+            card_last4=_text(result.get("Card Last 4 Digits")),
+            billing_start=billing_start,
+            billing_end=billing_end,
+            total_due_paise=parse_amount(result.get("Total Due")),
+            due_date=parse_date(result.get("Payment Due Date")),
+            tiers=dict(result.get("_meta", {}).get("tiers", {})),
+        )
+        record._result = result
+        return record
+
+    def to_dict(self):
+        """
+        The result as detect_bank_and_parse() returned it, the JSON
+        /api/parse sends; built from the typed fields for a record that was
+        not made by from_result()
+        """
+        if self._result is not None:
+            return self._result
+
+        def shown(value, missing=NOT_FOUND):
+            if value is MISSING:
+                return missing
+            return format_date(value) if isinstance(value, datetime.date) else value
+
+        if self.billing_start is MISSING or self.billing_end is MISSING:
+            billing_cycle = NOT_FOUND
+        else:
+            billing_cycle = f"{format_date(self.billing_start)} - {format_date(self.billing_end)}"
+        return {
+            "Bank": shown(self.bank, UNKNOWN_BANK),
+            "Cardholder": shown(self.cardholder),
+            "Card Last 4 Digits": shown(self.card_last4),
+            "Billing Cycle": billing_cycle,
+            "Total Due": NO_AMOUNT if self.total_due_paise is MISSING else format_amount(self.total_due_paise),
+            "Payment Due Date": shown(self.due_date),
+            "_meta": {"tiers": self.tiers},
+        }
+
+    def to_json(self):
+        """Typed fields for JSON: ISO dates, paise as integers, null when missing"""
+        data = {name: _json_value(getattr(self, name)) for name in self.FIELDS}
+        data["tiers"] = self.tiers
+        return data
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"StatementRecord({fields})"
@@ -0,0 +1,171 @@
+"""
+Splitting combined PDFs into the statements they hold.
+
+Some sources send several statements (months, or cards) back to back in
+one file. Parsed as one document, every field would come from the first
+statement only. split_and_parse() reads the text of every page, finds
+where each statement starts from cues on the page, and parses every
+statement on its own.
+
+A page starts a new statement when, compared with the statement so far,
+it shows
+  - a different card number next to a card label,
+  - a different billing cycle next to a statement period label, or
+  - the same opening line as the statement's first page together with a
+    billing cycle the statement has not shown, unless that line heads
+    every page anyway. It does when the second page repeats it with the
+    same billing cycle or none.
+
+Reading the pages is split between worker processes in contiguous chunks,
+and the statements are parsed in the same pool, so a long combined file
+takes about as long as reading its share of pages per worker. Workers open
+the PDF by path: an upload held in memory is written once to a shared
+copy (parsers.parallel) rather than sent to every worker.
+"""
+
+import os
+
+from parsers import telemetry
+from parsers.bank_parsers import detect_bank_and_parse
+from parsers.document import PAGE_BUDGET, Document, UnparseablePDF, pdf_bytes
+from parsers.extraction import BILLING_CYCLE, CARD_NUMBER, SearchText
+from parsers.parallel import _shared_copy, page_ranges, process_context
+
+# Files with fewer pages are read and parsed in this process; a pool costs
+# more than it saves on them
+PARALLEL_MIN_PAGES = 16
+
+# Path of the PDF, handed to each worker process by the pool initializer
+_worker_path = None
+
+
+def page_cues(text):
+    """(opening line, card last 4, billing cycle) of one page; None for a cue it lacks"""
+    header = next((line.strip() for line in text.splitlines() if line.strip()), None)
+    search_text = SearchText(text)
+    # Only the labelled tiers count; bare digits or date ranges also turn up
+    # in transaction rows
+    card, card_tier = CARD_NUMBER.extract(search_text)
+    cycle, cycle_tier = BILLING_CYCLE.extract(search_text)
+    return header, card if card_tier == 0 else None, cycle if cycle_tier in (0, 1) else None
+
+
+def find_segments(cues):
+    """(start, stop) page index ranges of the statements, from page_cues() of every page"""
+    segments = []
+    start = 0
+    header = card = cycle = None
+    running_header = False
+    for index, (page_header, page_card, page_cycle) in enumerate(cues):
+        if index == start + 1:
+            # Decided before the test below, or the second page of every
+            # statement with a running header would start a new one
+            running_header = page_header == header and page_cycle in (None, cycle)
+        if index > start:
+            new_statement = (
+                (page_card and card and page_card != card)
+                or (page_cycle and cycle and page_cycle != cycle)
+                or (page_header == header and page_cycle and page_cycle != cycle and not running_header)
+            )
+            if new_statement:
+                segments.append((start, index))
+                start = index
+                card = cycle = None
+        if index == start:
+            header = page_header
+            running_header = False
+        card = card or page_card
+        cycle = cycle or page_cycle
+    if cues:
+        segments.append((start, len(cues)))
+    return segments
+
+
+def _set_worker_path(path):
+    global _worker_path
+    _worker_path = path
+
+
+def _read_pages(document, start, stop):
+    """(texts, cues) of pages start to stop - 1"""
+    texts = document.read_pages(start, stop)
+    return texts, [page_cues(text) for text in texts]
+
+
+def _read_chunk(start, stop):
+    """Worker: _read_pages() of the PDF given to the pool"""
+    return _read_pages(Document(_worker_path), start, stop)
+
+
+def _parse_segment(start, stop, pages, truncated=None):
+    """
+    A result record for the statement on pages start to stop - 1;
+    truncated names the budget that cut its pages short, if one did
+    """
+    record = {"pages": [start + 1, stop]}
+    try:
+        record["result"] = detect_bank_and_parse(Document.from_pages(pages, truncated))
+    except UnparseablePDF as e:
+        record.update(e.to_dict())
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def split_and_parse(source, workers=None):
+    """
+    Parse every statement in a PDF that may hold several.
+
+    Returns a list with one record per statement, in page order: pages
+    holds its first and last page (1-based), and either result, as from
+    detect_bank_and_parse(), or error. Raises UnparseablePDF if the file
+    is rejected by Document.prescan(). Only the first PAGE_BUDGET pages
+    are read; past them, the last statement's record is a BudgetExceeded
+    one (reason page_budget) with the fields parsed from its pages.
+    """
+    data = pdf_bytes(source)
+    document = Document(source if data is None else data)
+    document.prescan()
+    page_count = min(document.page_count or 0, PAGE_BUDGET)
+    truncated = "page_budget" if (document.page_count or 0) > PAGE_BUDGET else None
+    if truncated:
+        telemetry.log("read_budget_exceeded", level="warning", budget=truncated, pages_read=page_count)
+    workers = min(workers or os.cpu_count() or 1, max(page_count, 1))
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        with telemetry.span("split_read"):
+            pages, cues = _read_pages(document, 0, page_count)
+        document.close()
+        segments = find_segments(cues)
+        return [_parse_segment(start, stop, pages[start:stop], truncated if stop == page_count else None)
+                for start, stop in segments]
+    document.close()
+
+    from concurrent.futures import ProcessPoolExecutor
+    # Workers open the file by path, the upload's or a shared copy of its bytes
+    copy = None if data is None else _shared_copy(data)
+    try:
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(),
+                                       initializer=_set_worker_path, initargs=(os.fspath(copy or source),))
+        except (OSError, NotImplementedError) as e:
+            telemetry.log("process_pool_unavailable", level="warning", error=str(e))
+            return split_and_parse(source, workers=1)
+
+        with pool:
+            with telemetry.span("split_read"):
+                pages, cues = [], []
+                # map() hands the chunks back in page order
+                for texts, chunk_cues in pool.map(_read_chunk, *zip(*page_ranges(page_count, workers))):
+                    pages.extend(texts)
+                    cues.extend(chunk_cues)
+            segments = find_segments(cues)
+            telemetry.log("split_segments", pages=page_count, segments=len(segments))
+            if len(segments) == 1:
+                return [_parse_segment(0, page_count, pages, truncated)]
+            starts, stops = zip(*segments)
+            return list(pool.map(_parse_segment, starts, stops, [pages[start:stop] for start, stop in segments],
+                                 [truncated if stop == page_count else None for stop in stops]))
+    finally:
+        if copy is not None:
+            os.unlink(copy)
@@ -0,0 +1,212 @@
+"""
+Persistent store of parsed statements.
+
+Each result from detect_bank_and_parse() is kept in a SQLite file (WAL
+mode, so readers never wait for the writer) together with the SHA-256 of
+the PDF it came from. The typed fields of parsers.record are stored in
+their own indexed columns, so questions like "card ending 1234, due this
+week" are answered from the indexes without re-parsing anything. Parsing
+the same PDF again replaces its row.
+
+Queries page with a keyset cursor: each page ends with the id to pass as
+after for the next one, so deep pages cost the same as the first.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from parsers.record import MISSING, StatementRecord
+
+# Rows written per transaction by bulk()
+BATCH_SIZE = 500
+# Largest page query() hands back
+MAX_LIMIT = 500
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS statements ("
+    " id INTEGER PRIMARY KEY,"
+    " content_hash TEXT NOT NULL UNIQUE,"
+    " source TEXT,"
+    " created REAL NOT NULL,"
+    " bank TEXT,"
+    " cardholder TEXT,"
+    " card_last4 TEXT,"
+    " billing_start TEXT,"
+    " billing_end TEXT,"
+    " total_due_paise INTEGER,"
+    " due_date TEXT,"
+    " result TEXT NOT NULL)",
+    # Every index also holds the rowid, so equality filters come back in id
+    # order and keyset pages need no sort
+    "CREATE INDEX IF NOT EXISTS statements_bank ON statements (bank)",
+    "CREATE INDEX IF NOT EXISTS statements_card ON statements (card_last4, due_date)",
+    "CREATE INDEX IF NOT EXISTS statements_due ON statements (due_date)",
+    "CREATE INDEX IF NOT EXISTS statements_cycle ON statements (billing_start, billing_end)",
+]
+
+_INSERT = (
+    "INSERT INTO statements (content_hash, source, created, bank, cardholder, card_last4,"
+    " billing_start, billing_end, total_due_paise, due_date, result)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (content_hash) DO UPDATE SET"
+    " source = excluded.source, created = excluded.created, bank = excluded.bank,"
+    " cardholder = excluded.cardholder, card_last4 = excluded.card_last4,"
+    " billing_start = excluded.billing_start, billing_end = excluded.billing_end,"
+    " total_due_paise = excluded.total_due_paise, due_date = excluded.due_date, result = excluded.result"
+)
+
+_COLUMNS = ("id", "content_hash", "source", "created", "bank", "cardholder", "card_last4",
+            "billing_start", "billing_end", "total_due_paise", "due_date")
+
+
+def content_hash(data):
+    """SHA-256 of the PDF bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    """SHA-256 of the file at path, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _column(value):
+    if value is MISSING:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _row(digest, result, source, created):
+    record = StatementRecord.from_result(result)
+    return (
+        digest, source, created, _column(record.bank), _column(record.cardholder), _column(record.card_last4),
+        _column(record.billing_start), _column(record.billing_end), _column(record.total_due_paise),
+        _column(record.due_date), json.dumps(result, ensure_ascii=False),
+    )
+
+
+class StatementStore:
+    """Parsed statements in a SQLite file, indexed by bank, card, due date and billing cycle"""
+
+    def __init__(self, db_path, batch_size=BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        db = self._db()
+        with db:
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    def add(self, digest, result, source=None):
+        """Store result under the content hash of its PDF, replacing any earlier row"""
+        db = self._db()
+        with db:
+            db.execute(_INSERT, _row(digest, result, source, time.time()))
+
+    def add_many(self, items):
+        """Store (content hash, result, source) triples, batch_size per transaction"""
+        with self.bulk() as writer:
+            for digest, result, source in items:
+                writer.add(digest, result, source)
+
+    def bulk(self):
+        """A BulkWriter for this store; use it as a context manager"""
+        return BulkWriter(self)
+
+    def query(self, bank=None, card_last4=None, due_from=None, due_to=None,
+              cycle_from=None, cycle_to=None, after=None, limit=50, full=False):
+        """
+        One page of statements matching every filter given, oldest first.
+
+        Dates are ISO strings and ranges include both ends; cycle_from and
+        cycle_to select billing cycles lying within them. Returns (rows,
+        next) where next is the after value for the following page, or None
+        on the last page. With full=True each row also carries the result.
+        """
+        clauses, params = [], []
+        for clause, value in (
+            ("bank = ?", bank),
+            ("card_last4 = ?", card_last4),
+            ("due_date >= ?", due_from),
+            ("due_date <= ?", due_to),
+            ("billing_start >= ?", cycle_from),
+            ("billing_end <= ?", cycle_to),
+            ("id > ?", after),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        columns = _COLUMNS + (("result",) if full else ())
+        sql = f"SELECT {', '.join(columns)} FROM statements"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id LIMIT ?"
+        rows = self._db().execute(sql, params + [limit + 1]).fetchall()
+
+        statements = []
+        for row in rows[:limit]:
+            statement = dict(zip(columns, row))
+            if full:
+                statement["result"] = json.loads(statement["result"])
+            statements.append(statement)
+        next_after = statements[-1]["id"] if len(rows) > limit else None
+        return statements, next_after
+
+    def get(self, digest):
+        """Stored result for a content hash, or None"""
+        row = self._db().execute("SELECT result FROM statements WHERE content_hash = ?", (digest,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def stats(self):
+        db = self._db()
+        return {
+            "statements": db.execute("SELECT COUNT(*) FROM statements").fetchone()[0],
+            "path": self.db_path,
+        }
+
+    def _db(self):
+        """SQLite connection for the calling thread"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3  # only needed when a store is configured
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+
+class BulkWriter:
+    """Buffers rows for a StatementStore and writes them batch_size per transaction"""
+
+    def __init__(self, store):
+        self.store = store
+        self.written = 0
+        self._rows = []
+
+    def add(self, digest, result, source=None):
+        self._rows.append(_row(digest, result, source, time.time()))
+        if len(self._rows) >= self.store.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        db = self.store._db()
+        with db:
+            db.executemany(_INSERT, self._rows)
+        self.written += len(self._rows)
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
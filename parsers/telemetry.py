@@ -0,0 +1,213 @@
+"""
+Timing spans, counters and structured logs.
+
+Stages are timed with span(), which feeds a histogram per stage; counters
+track fallbacks, cache lookups and which pattern tier settled each field.
+render() writes everything in the Prometheus text format for /api/metrics.
+Metrics live in the process that records them, so work done in batch
+worker processes is not counted.
+
+Set METRICS_ENABLED=0 to turn recording off; span() then hands back a
+shared no-op object and the counters return straight away. log() writes
+one JSON object per line to stderr, so it never mixes with command line
+output, and is always on.
+"""
+
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Upper bounds in seconds, from sub-millisecond regex work to slow fallbacks
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+            if not self.labels and not self.values:
+                lines.append(f"{self.name} 0")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self.values.clear()
+
+
+class Histogram:
+    """Observations bucketed by BUCKETS, per label combination"""
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (last one is +Inf), sum]
+        self.values = {}
+        # Set to a dict to also keep every raw observation, for percentiles
+        # in benchmarks; label values -> list of values
+        self.samples = None
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+            if self.samples is not None:
+                self.samples.setdefault(label_values, []).append(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    labels = _labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total:.6f}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self.values.clear()
+
+
+STAGE_SECONDS = Histogram("parser_stage_seconds", "Time spent in each parsing stage", ("stage",))
+FALLBACKS = Counter("parser_pdfminer_fallbacks_total", "Documents re-read with pdfminer after PyMuPDF failed")
+PATTERN_HITS = Counter("parser_pattern_hits_total", "Cascade tier that settled each field", ("field", "tier"))
+PARSERS_USED = Counter("parser_dispatch_total", "Statements handled by each parser class", ("parser",))
+CACHE_LOOKUPS = Counter("parser_cache_lookups_total", "Result cache lookups", ("result",))
+REQUESTS = Counter("parser_requests_total", "API requests by endpoint and status", ("endpoint", "status"))
+REGEX_TIMEOUTS = Counter("parser_regex_timeouts_total", "Field cascades stopped at their deadline", ("field",))
+NEAR_DUPLICATES = Counter("parser_near_duplicates_total", "Uploads found to be near-duplicates of earlier ones", ("action",))
+
+METRICS = [STAGE_SECONDS, FALLBACKS, PATTERN_HITS, PARSERS_USED, CACHE_LOOKUPS, REQUESTS, REGEX_TIMEOUTS, NEAR_DUPLICATES]
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage):
+    """Context manager timing one stage into parser_stage_seconds"""
+    return _Span(stage) if ENABLED else _NO_SPAN
+
+
+def observe(stage, seconds):
+    """Record a stage duration measured elsewhere"""
+    STAGE_SECONDS.observe(seconds, stage)
+
+
+def tier_label(field, tier):
+    """
+    Label for a tier as from Field.extract(): its index, fallback, timeout
+    or none; a field with a label of its own reports that for any value found
+    """
+    if tier is None:
+        return "none"
+    if tier == "timeout":  # parsers.extraction.TIMED_OUT
+        return tier
+    if field.label is not None:
+        return field.label
+    if tier == len(field.tiers):
+        return "fallback"
+    return str(tier)
+
+
+def count_tier(field, tier):
+    """Count which tier of field's cascade produced its value; tier as from Field.extract()"""
+    if not ENABLED:
+        return
+    PATTERN_HITS.inc(field.name, tier_label(field, tier))
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    for metric in METRICS:
+        metric.reset()
+
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def log(event, level="info", **fields):
+    """Write one structured log line to stderr"""
+    record = {"ts": round(time.time(), 3), "level": level, "event": event}
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    sys.stderr.flush()
@@ -0,0 +1,139 @@
+"""
+Transaction table extraction.
+
+Works from PyMuPDF word boxes rather than the flattened page text: words
+are grouped into visual rows by their vertical position, and a row that
+starts with a date and carries at least one amount is a transaction. The
+first amount on the row is the transaction amount and the second, if any,
+the running balance. Rows are collected column by column, and all amounts
+of a document are converted to integer paise in one batch at the end.
+"""
+
+import re
+from array import array
+
+from parsers.extraction import LazyRegex
+
+# Date at the start of a row, possibly fused with the description
+_ROW_DATE = LazyRegex(r"(\d{1,2}[-/ ](?:[A-Za-z]{3,9}|\d{1,2})[-/ ](?:\d{4}|\d{2}))\s*(.*)", re.DOTALL)
+# Amount with two decimals, optionally behind a currency sign and followed by Dr/Cr
+_AMOUNT = LazyRegex(r"[^\d\s]{0,4}?(-?\d[\d,]*\.\d{2})(Cr|Dr|CR|DR)?")
+_CURRENCY = {"Rs", "Rs.", "INR", "₹"}
+_DIRECTIONS = {"DR": "DR", "CR": "CR", "DEBIT": "DR", "CREDIT": "CR"}
+
+NO_BALANCE = -(2 ** 63)
+
+
+class Transactions:
+    """Transaction rows of a statement, stored as parallel columns"""
+
+    __slots__ = ("pages", "dates", "descriptions", "directions", "amounts", "balances")
+
+    def __init__(self):
+        self.pages = array("i")
+        self.dates = []
+        self.descriptions = []
+        self.directions = []
+        # Integer paise; balances hold NO_BALANCE where a row shows none
+        self.amounts = array("q")
+        self.balances = array("q")
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_dict(self):
+        """Columns as plain lists, for JSON"""
+        return {
+            "page": list(self.pages),
+            "date": self.dates,
+            "description": self.descriptions,
+            "direction": self.directions,
+            "amount_paise": list(self.amounts),
+            "balance_paise": [None if b == NO_BALANCE else b for b in self.balances],
+        }
+
+    def to_arrow(self):
+        """Columns as a pyarrow Table (needs pyarrow)"""
+        import pyarrow as pa
+        return pa.table({
+            "page": pa.array(self.pages, type=pa.int32()),
+            "date": pa.array(self.dates, type=pa.string()),
+            "description": pa.array(self.descriptions, type=pa.string()),
+            "direction": pa.array(self.directions, type=pa.string()),
+            "amount_paise": pa.array(self.amounts, type=pa.int64()),
+            "balance_paise": pa.array(self.to_dict()["balance_paise"], type=pa.int64()),
+        })
+
+
+def _rows(words):
+    """Group word boxes into rows by vertical position, each row sorted left to right"""
+    words = sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+    rows = []
+    row, row_mid, tolerance = [], None, 0
+    for word in words:
+        mid = (word[1] + word[3]) / 2
+        if row and mid - row_mid > tolerance:
+            rows.append(sorted(row))
+            row = []
+        if not row:
+            row_mid = mid
+            tolerance = (word[3] - word[1]) / 2
+        row.append(word)
+    if row:
+        rows.append(sorted(row))
+    return rows
+
+
+def _paise(amounts):
+    """Amount strings with two decimals to integer paise, in one pass"""
+    if not amounts:
+        return array("q")
+    digits = "\n".join(amounts).replace(",", "").replace(".", "")
+    return array("q", map(int, digits.split("\n")))
+
+
+def extract_transactions(document):
+    """Transactions found on every page of a parsers.document.Document"""
+    table = Transactions()
+    raw_amounts, raw_balances = [], []
+
+    for page_number, words in document.page_words():
+        for row in _rows(words):
+            text_words, amounts, direction = [], [], ""
+            for word in row:
+                token = word[4]
+                upper = token.upper()
+                if upper in _DIRECTIONS:
+                    direction = _DIRECTIONS[upper]
+                    continue
+                if token in _CURRENCY:
+                    continue
+                match = _AMOUNT.fullmatch(token)
+                if match:
+                    amounts.append(match.group(1))
+                    if match.group(2):
+                        direction = match.group(2).upper()
+                elif not amounts and not direction:
+                    # The description is everything left of the first marker or amount
+                    text_words.append(token)
+            if not amounts or not text_words:
+                continue
+            dated = _ROW_DATE.match(" ".join(text_words))
+            if not dated:
+                continue
+            table.pages.append(page_number + 1)
+            table.dates.append(dated.group(1))
+            table.descriptions.append(dated.group(2).strip())
+            table.directions.append(direction)
+            raw_amounts.append(amounts[0])
+            raw_balances.append(amounts[1] if len(amounts) > 1 else None)
+
+    table.amounts = _paise(raw_amounts)
+    balances = _paise([b for b in raw_balances if b is not None])
+    table.balances = array("q", [NO_BALANCE] * len(raw_balances))
+    position = 0
+    for index, balance in enumerate(raw_balances):
+        if balance is not None:
+            table.balances[index] = balances[position]
+            position += 1
+    return table
@@ -0,0 +1,149 @@
+"""
+Uploaded PDFs, spooled to disk and hashed as they arrive.
+
+A SpooledUpload takes the body of an upload a chunk at a time. It keeps
+the bytes in memory up to SPOOL_BYTES and then moves them to a temporary
+file. The cache key and the SHA-256 used by the statement store are both
+updated with every chunk, so nothing has to read the upload again to hash
+it. view() hands the PDF to PyMuPDF without a copy: a memoryview of the
+in-memory buffer, or of a read-only mmap of the file. The pages the parser
+touches are then read from the page cache, and a worker's memory stays
+about the same whether the upload is 1 MB or 100 MB.
+
+app.py makes Werkzeug write every multipart file part straight into one
+of these, instead of a temporary file that file.read() would then copy
+into memory.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+from parsers.cache import content_hasher
+
+# Uploads larger than this go to a temporary file rather than memory
+SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+# Directory for the temporary files; the system default if unset
+SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR") or None
+# Bytes copied per read by from_stream()
+CHUNK_SIZE = 256 * 1024
+
+
+class SpooledUpload:
+    """The bytes of one upload: in memory up to spool_bytes, then in a temporary file"""
+
+    def __init__(self, spool_bytes=SPOOL_BYTES, directory=SPOOL_DIR):
+        self.spool_bytes = spool_bytes
+        self.directory = directory
+        self.size = 0
+        self._file = io.BytesIO()
+        self._on_disk = False
+        self._cache_digest = content_hasher()
+        self._sha256 = hashlib.sha256()
+        self._view = None
+        self._map = None
+        # The request and any background job holding the upload each close
+        # it once; it is released when the last of them does
+        self._owners = 1
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_stream(cls, stream, spool_bytes=SPOOL_BYTES, directory=SPOOL_DIR):
+        """Spool everything read from a binary stream"""
+        upload = cls(spool_bytes, directory)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            upload.write(chunk)
+        upload.seek(0)
+        return upload
+
+    @property
+    def cache_key(self):
+        """parsers.cache.content_key() of the bytes written"""
+        return self._cache_digest.hexdigest()
+
+    @property
+    def content_hash(self):
+        """parsers.store.content_hash() of the bytes written"""
+        return self._sha256.hexdigest()
+
+    @property
+    def path(self):
+        """Path of the temporary file, or None while the upload is in memory"""
+        return self._file.name if self._on_disk else None
+
+    def write(self, chunk):
+        self._cache_digest.update(chunk)
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        if not self._on_disk and self.size > self.spool_bytes:
+            self._roll_over()
+        return self._file.write(chunk)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def view(self):
+        """
+        The upload as a memoryview, for Document or detect_bank_and_parse();
+        mapped from the temporary file rather than read into memory
+        """
+        if self._view is None:
+            if self._on_disk:
+                import mmap  # only needed once an upload outgrows memory
+                self._file.flush()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+            else:
+                self._view = self._file.getbuffer()
+        return self._view
+
+    def retain(self):
+        """Keep the upload open past the request, for work that outlives it; close() it when done"""
+        with self._lock:
+            self._owners += 1
+        return self
+
+    def close(self):
+        with self._lock:
+            self._owners -= 1
+            if self._owners > 0:
+                return
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+        except BufferError:
+            # Something still exports the buffer: the temporary file is
+            # still unlinked, and the memory goes when it is collected
+            if self._on_disk:
+                self._file.close()
+        self._view = self._map = None
+
+    def _roll_over(self):
+        spooled = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", dir=self.directory)
+        spooled.write(self._file.getbuffer())
+        self._file = spooled
+        self._on_disk = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
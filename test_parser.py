@@ -6,6 +6,7 @@ Usage: python test_parser.py path/to/your/statement.pdf
 import sys
 from parsers.bank_parsers import detect_bank_and_parse
 from parsers.base_parser import BaseParser
+from parsers.document import Document
 
 def test_pdf(pdf_path):
     print(f"\n{'='*60}")
@@ -13,10 +14,11 @@ def test_pdf(pdf_path):
     print(f"{'='*60}")
     print(f"📄 File: {pdf_path}\n")
     
-    # Step 1: Extract text
+    # Step 1: Extract text (once; every step below reuses this Document)
     print("Step 1: Extracting text from PDF...")
     try:
-        parser = BaseParser(pdf_path)
+        document = Document(pdf_path)
+        parser = BaseParser(document)
         text = parser.text
         print(f"✅ Extracted {len(text)} characters")
         
@@ -42,7 +44,7 @@ def test_pdf(pdf_path):
     
     # Step 2: Detect bank
     print(f"\nStep 2: Detecting bank...")
-    text_lower = text.lower()
+    text_lower = document.lower
     
     banks_found = []
     bank_keywords = {
@@ -74,16 +76,20 @@ def test_pdf(pdf_path):
     # Step 3: Parse data
     print(f"\nStep 3: Parsing statement data...")
     try:
-        result = detect_bank_and_parse(pdf_path)
+        result = detect_bank_and_parse(document)
         
         if result:
             print(f"\n{'='*60}")
             print("✅ PARSING SUCCESSFUL!")
             print(f"{'='*60}")
+            meta = result.pop("_meta", {})
             for key, value in result.items():
                 status = "✅" if value not in ["Not Found", "₹0.00", "Unknown Bank"] else "❌"
                 print(f"{status} {key:20s}: {value}")
-            print(f"{'='*60}\n")
+            print(f"{'='*60}")
+            for key, value in meta.items():
+                print(f"   {key:20s}: {value}")
+            print()
         else:
             print("\n❌ PARSING FAILED - No data could be extracted")
             print("\nPossible reasons:")